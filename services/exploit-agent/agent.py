@@ -10,7 +10,7 @@ import requests
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
 
-from shared.database import DatabaseManager, Finding, FindingStatus, Evidence, EvidenceType
+from shared.database import DatabaseManager, Finding, FindingStatus, Evidence, EvidenceType, bulk_insert
 from shared.config import settings
 from shared.storage import StorageManager
 
@@ -170,23 +170,23 @@ class ExploitAgent:
     def generate_evidence(self, session, finding: Finding, exploit_result: Dict[str, Any]):
         """Generate and store evidence"""
         print(f"Generating evidence for finding {finding.id}")
+        evidence_rows = []
         
         # Store screenshot if available
         if "screenshot" in exploit_result:
             try:
+                screenshot_size = os.path.getsize(exploit_result["screenshot"])
                 with open(exploit_result["screenshot"], "rb") as f:
-                    screenshot_data = f.read()
                     storage_key = f"evidence/{finding.project_id}/{finding.id}/exploit_screenshot.png"
-                    self.storage_manager.upload_bytes(storage_key, screenshot_data, len(screenshot_data))
+                    self.storage_manager.upload_stream(storage_key, f, screenshot_size, content_type="image/png")
                     
-                    evidence = Evidence(
-                        finding_id=finding.id,
-                        type=EvidenceType.SCREENSHOT,
-                        storage_key=storage_key,
-                        filename="exploit_screenshot.png",
-                        size_bytes=len(screenshot_data)
-                    )
-                    session.add(evidence)
+                    evidence_rows.append({
+                        "finding_id": finding.id,
+                        "type": EvidenceType.SCREENSHOT,
+                        "storage_key": storage_key,
+                        "filename": "exploit_screenshot.png",
+                        "size_bytes": screenshot_size
+                    })
                 
                 # Clean up temp file
                 os.remove(exploit_result["screenshot"])
@@ -198,20 +198,20 @@ class ExploitAgent:
         try:
             exploit_json = json.dumps(exploit_result, indent=2)
             storage_key = f"evidence/{finding.project_id}/{finding.id}/exploit_details.json"
-            self.storage_manager.upload_bytes(storage_key, exploit_json.encode(), len(exploit_json))
+            self.storage_manager.upload_bytes(storage_key, exploit_json.encode(), "application/json")
             
-            evidence = Evidence(
-                finding_id=finding.id,
-                type=EvidenceType.RAW_REQUEST,
-                storage_key=storage_key,
-                filename="exploit_details.json",
-                size_bytes=len(exploit_json)
-            )
-            session.add(evidence)
+            evidence_rows.append({
+                "finding_id": finding.id,
+                "type": EvidenceType.RAW_REQUEST,
+                "storage_key": storage_key,
+                "filename": "exploit_details.json",
+                "size_bytes": len(exploit_json)
+            })
         
         except Exception as e:
             print(f"Error storing exploit details: {e}")
         
+        bulk_insert(session, Evidence, evidence_rows)
         session.commit()
 
 def main():
@@ -9,7 +9,7 @@ import os
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../../'))
 
-from shared.security import create_access_token, hash_password, verify_password, generate_api_key
+from shared.security import create_access_token, hash_password_async, verify_password_async, generate_api_key
 from shared.database import DatabaseManager
 from shared.config import settings
 
@@ -47,7 +47,7 @@ async def signup(request: SignupRequest):
         )
     
     user_id = f"user_{len(users_db) + 1}"
-    hashed_password = hash_password(request.password)
+    hashed_password = await hash_password_async(request.password)
     
     users_db[request.email] = {
         "user_id": user_id,
@@ -69,7 +69,7 @@ async def login(request: LoginRequest):
     """Login and get access token"""
     user = users_db.get(request.email)
     
-    if not user or not verify_password(request.password, user["password"]):
+    if not user or not await verify_password_async(request.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
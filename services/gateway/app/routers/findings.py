@@ -3,6 +3,7 @@ Findings endpoints
 """
 from fastapi import APIRouter, Depends, HTTPException, status
 from pydantic import BaseModel
+from sqlalchemy.orm import lazyload
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 import uuid
@@ -52,7 +53,14 @@ async def list_findings(project_id: str, current_user: dict = Depends(lambda: {"
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        findings = session.query(Finding).filter(Finding.project_id == uuid.UUID(project_id)).all()
+        # Only finding columns are returned, so skip the eager evidence/vote loads
+        findings = (
+            session.query(Finding)
+            .options(lazyload(Finding.evidence), lazyload(Finding.votes))
+            .filter(Finding.project_id == uuid.UUID(project_id))
+            .execution_options(stream_results=True)
+            .yield_per(500)
+        )
         
         return [
             FindingResponse(
@@ -63,7 +71,7 @@ async def list_findings(project_id: str, current_user: dict = Depends(lambda: {"
                 severity=f.severity.value,
                 cvss_score=f.cvss_score,
                 confidence=f.confidence,
-                status=f.status.value,
+                status=f.status,
                 affected_url=f.affected_url,
                 affected_parameter=f.affected_parameter,
                 created_at=f.created_at,
@@ -101,7 +109,7 @@ async def get_finding(finding_id: str, current_user: dict = Depends(lambda: {"su
             severity=finding.severity.value,
             cvss_score=finding.cvss_score,
             confidence=finding.confidence,
-            status=finding.status.value,
+            status=finding.status,
             affected_url=finding.affected_url,
             affected_parameter=finding.affected_parameter,
             created_at=finding.created_at,
@@ -147,7 +155,7 @@ async def validate_finding(
         if not project:
             raise HTTPException(status_code=404, detail="Project not found")
         
-        finding.status = FindingStatus(request.status)
+        finding.status = FindingStatus(request.status).value
         if request.status == "validated":
             finding.validated_at = datetime.utcnow()
         
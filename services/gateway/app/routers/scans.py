@@ -139,7 +139,7 @@ async def list_jobs(project_id: str, current_user: dict = Depends(lambda: {"sub"
                 project_id=str(j.project_id),
                 test_case_id=str(j.test_case_id),
                 agent_id=j.agent_id,
-                status=j.status.value,
+                status=j.status,
                 priority=j.priority,
                 retries=j.retries,
                 eta=j.eta,
@@ -176,7 +176,7 @@ async def get_job(job_id: str, current_user: dict = Depends(lambda: {"sub": "use
             project_id=str(job.project_id),
             test_case_id=str(job.test_case_id),
             agent_id=job.agent_id,
-            status=job.status.value,
+            status=job.status,
             priority=job.priority,
             retries=job.retries,
             eta=job.eta,
@@ -84,7 +84,7 @@ class LearningAgent:
                 metadata = {
                     "severity": finding.severity.value,
                     "confidence": finding.confidence,
-                    "status": finding.status.value,
+                    "status": finding.status,
                     "affected_url": finding.affected_url or "",
                     "affected_parameter": finding.affected_parameter or ""
                 }
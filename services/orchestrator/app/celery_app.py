@@ -2,6 +2,7 @@
 Celery application for async task processing
 """
 from celery import Celery
+from celery.schedules import crontab
 import sys
 import os
 
@@ -26,7 +27,13 @@ celery_app.conf.update(
     task_track_started=True,
     task_time_limit=3600,  # 1 hour max
     worker_prefetch_multiplier=1,
-    worker_max_tasks_per_child=100
+    worker_max_tasks_per_child=100,
+    beat_schedule={
+        "maintain-log-partitions": {
+            "task": "maintain_log_partitions",
+            "schedule": crontab(hour=3, minute=0)
+        }
+    }
 )
 
 @celery_app.task(name="execute_agent_job")
@@ -161,3 +168,17 @@ def run_learning_agent(project_id: str):
             return {"status": "failed", "project_id": project_id}
     except Exception as e:
         return {"status": "error", "project_id": project_id, "error": str(e)}
+
+@celery_app.task(name="maintain_log_partitions")
+def maintain_log_partitions():
+    """
+    Create upcoming monthly log partitions and detach expired ones
+    """
+    from shared.database import DatabaseManager
+    
+    db_manager = DatabaseManager(settings.database_url)
+    detached = db_manager.maintain_log_partitions(
+        settings.log_partition_months_ahead,
+        settings.log_retention_months
+    )
+    return {"detached": detached}
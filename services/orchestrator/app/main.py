@@ -86,7 +86,7 @@ async def get_scan_status(project_id: str):
         }
         
         for job in jobs:
-            status_counts[job.status.value] += 1
+            status_counts[job.status] += 1
         
         total_jobs = len(jobs)
         progress = (status_counts["completed"] / total_jobs * 100) if total_jobs > 0 else 0
@@ -3,14 +3,20 @@ Seed WSTG test cases into database
 """
 import sys
 import os
+import functools
 from datetime import datetime
 import uuid
 
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../../'))
 
 from shared.database import DatabaseManager, TestCase
 from shared.config import settings
 
+# Fixed namespace so each test case id is derived from its WSTG id
+WSTG_NAMESPACE = uuid.UUID("6f1c2a4e-8b3d-5e7f-9a0b-1c2d3e4f5a6b")
+
 WSTG_TEST_CASES = [
     # Information Gathering
     {"wstg_id": "WSTG-INFO-01", "title": "Conduct Search Engine Discovery", "category": "Information Gathering", "agent": "recon-agent", "priority": 1},
@@ -72,36 +78,36 @@ WSTG_TEST_CASES = [
     {"wstg_id": "WSTG-INPV-13", "title": "Testing for Format String Injection", "category": "Input Validation", "agent": "fuzz-agent", "priority": 3},
 ]
 
+@functools.cache
+def _seed_rows():
+    """Build the test case rows once per process"""
+    now = datetime.utcnow()
+    return [
+        {
+            "id": uuid.uuid5(WSTG_NAMESPACE, tc_data["wstg_id"]),
+            "wstg_id": tc_data["wstg_id"],
+            "title": tc_data["title"],
+            "description": f"Automated test for {tc_data['title']}",
+            "category": tc_data["category"],
+            "automatable": True,
+            "assigned_agent": tc_data["agent"],
+            "priority": tc_data["priority"],
+            "extra": {},
+            "created_at": now
+        }
+        for tc_data in WSTG_TEST_CASES
+    ]
+
 def seed_test_cases():
     """Seed WSTG test cases into database"""
     db_manager = DatabaseManager(settings.database_url)
     session = next(db_manager.get_session())
     
     try:
-        # Check if test cases already exist
-        existing_count = session.query(TestCase).count()
-        if existing_count > 0:
-            print(f"Test cases already seeded ({existing_count} cases)")
-            return
-        
-        # Insert all test cases
-        for tc_data in WSTG_TEST_CASES:
-            test_case = TestCase(
-                id=uuid.uuid4(),
-                wstg_id=tc_data["wstg_id"],
-                title=tc_data["title"],
-                description=f"Automated test for {tc_data['title']}",
-                category=tc_data["category"],
-                automatable=True,
-                assigned_agent=tc_data["agent"],
-                priority=tc_data["priority"],
-                metadata={},
-                created_at=datetime.utcnow()
-            )
-            session.add(test_case)
-        
+        # Rows that already exist are skipped, so re-running the seeder is a no-op
+        result = session.execute(pg_insert(TestCase).on_conflict_do_nothing(), _seed_rows())
         session.commit()
-        print(f"Successfully seeded {len(WSTG_TEST_CASES)} WSTG test cases")
+        print(f"Seeded WSTG test cases ({result.rowcount} new, {len(WSTG_TEST_CASES)} total)")
     
     except Exception as e:
         print(f"Error seeding test cases: {e}")
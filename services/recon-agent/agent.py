@@ -3,11 +3,14 @@ Recon Agent - Performs reconnaissance, crawling, and fingerprinting
 """
 import os
 import sys
-import json
-from typing import Dict, Any, List
+import atexit
+from dataclasses import dataclass, field
+from typing import Dict, Any, List, Set
 from playwright.sync_api import sync_playwright
 from bs4 import BeautifulSoup
+import orjson
 import requests
+from sqlalchemy import insert
 from urllib.parse import urljoin, urlparse
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
@@ -16,15 +19,48 @@ from shared.database import DatabaseManager, Job, JobStatus, Finding, FindingSev
 from shared.config import settings
 from shared.storage import StorageManager
 
+# Subresources the crawler never inspects; aborting them keeps page loads to HTML + DOM
+_SKIP_RESOURCE_TYPES = {"image", "media", "font", "stylesheet", "other"}
+
+# Signature detection only needs the start of the page
+_FINGERPRINT_MAX_BYTES = 512 * 1024
+
+# Process-wide Playwright driver and browser, launched on first crawl
+_PW = None
+_BROWSER = None
+
+def _get_browser():
+    """Return the shared Chromium instance, launching it on first use"""
+    global _PW, _BROWSER
+    if _BROWSER is None:
+        _PW = sync_playwright().start()
+        _BROWSER = _PW.chromium.launch(headless=True)
+        atexit.register(_close_browser)
+    return _BROWSER
+
+def _close_browser():
+    """Shut down the shared browser at process exit"""
+    global _PW, _BROWSER
+    if _BROWSER is not None:
+        _BROWSER.close()
+        _PW.stop()
+        _BROWSER = None
+        _PW = None
+
+@dataclass
+class ScanState:
+    """Discoveries accumulated while running a single recon job"""
+    urls: Set[str] = field(default_factory=set)
+    params: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    techs: List[Dict[str, Any]] = field(default_factory=list)
+    findings: List[Dict[str, Any]] = field(default_factory=list)
+
 class ReconAgent:
     """Reconnaissance agent for web application scanning"""
     
     def __init__(self):
         self.db_manager = DatabaseManager(settings.database_url)
         self.storage_manager = StorageManager()
-        self.discovered_urls = set()
-        self.discovered_params = {}
-        self.technologies = []
     
     def execute(self, job_id: str):
         """Execute reconnaissance job"""
@@ -45,16 +81,25 @@ class ReconAgent:
                 return
             
             # Execute recon on each target
+            state = ScanState()
             for target in targets:
                 print(f"Scanning target: {target.value}")
-                self.scan_target(session, job, target.value)
+                state = self.scan_target(job, target.value, state)
+            
+            # Insert all pending findings and fetch their ids in one round trip
+            finding_ids = []
+            if state.findings:
+                finding_ids = session.scalars(
+                    insert(Finding).returning(Finding.id), state.findings
+                ).all()
             
             # Update job status
             job.status = JobStatus.COMPLETED
             job.result = {
-                "urls_discovered": len(self.discovered_urls),
-                "parameters_discovered": len(self.discovered_params),
-                "technologies": self.technologies
+                "urls_discovered": len(state.urls),
+                "parameters_discovered": len(state.params),
+                "technologies": state.techs,
+                "finding_ids": [str(fid) for fid in finding_ids]
             }
             session.commit()
             
@@ -67,151 +112,160 @@ class ReconAgent:
         finally:
             session.close()
     
-    def scan_target(self, session, job, target_url: str):
+    def scan_target(self, job, target_url: str, state: ScanState) -> ScanState:
         """Scan a single target"""
         # Crawl with Playwright
-        self.crawl_with_playwright(target_url)
+        self.crawl_with_playwright(target_url, state)
         
         # Fingerprint technologies
-        self.fingerprint_technologies(target_url)
+        self.fingerprint_technologies(target_url, state)
         
         # Discover parameters
-        self.discover_parameters(target_url)
+        self.discover_parameters(target_url, state)
         
         # Create findings for interesting discoveries
-        self.create_findings(session, job)
+        self.create_findings(job, state)
+        
+        return state
     
-    def crawl_with_playwright(self, base_url: str, max_pages: int = 50):
+    def crawl_with_playwright(self, base_url: str, state: ScanState, max_pages: int = 50):
         """Crawl website using Playwright"""
         print(f"Crawling {base_url}")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-            )
-            page = context.new_page()
-            
-            to_visit = [base_url]
-            visited = set()
-            
-            while to_visit and len(visited) < max_pages:
-                url = to_visit.pop(0)
+        context = _get_browser().new_context(
+            user_agent="Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+        )
+        context.route(
+            "**/*",
+            lambda route: route.abort()
+            if route.request.resource_type in _SKIP_RESOURCE_TYPES
+            else route.continue_()
+        )
+        page = context.new_page()
+        
+        base_netloc = urlparse(base_url).netloc
+        to_visit = [base_url]
+        queued = {base_url}
+        visited = set()
+        
+        while to_visit and len(visited) < max_pages:
+            url = to_visit.pop(0)
+            
+            if url in visited:
+                continue
+            
+            try:
+                print(f"Visiting: {url}")
+                page.goto(url, timeout=10000, wait_until="networkidle")
+                visited.add(url)
+                state.urls.add(url)
                 
-                if url in visited:
-                    continue
+                # Extract links
+                links = page.eval_on_selector_all(
+                    'a[href]',
+                    '(elements) => elements.map(e => e.href)'
+                )
                 
-                try:
-                    print(f"Visiting: {url}")
-                    page.goto(url, timeout=10000, wait_until="networkidle")
-                    visited.add(url)
-                    self.discovered_urls.add(url)
-                    
-                    # Extract links
-                    links = page.eval_on_selector_all(
-                        'a[href]',
-                        '(elements) => elements.map(e => e.href)'
-                    )
-                    
-                    for link in links:
-                        absolute_url = urljoin(base_url, link)
-                        parsed = urlparse(absolute_url)
-                        
-                        # Only follow same-domain links
-                        if parsed.netloc == urlparse(base_url).netloc:
-                            if absolute_url not in visited:
-                                to_visit.append(absolute_url)
-                    
-                    # Extract forms and parameters
-                    forms = page.query_selector_all('form')
-                    for form in forms:
-                        inputs = form.query_selector_all('input, select, textarea')
-                        for inp in inputs:
-                            name = inp.get_attribute('name')
-                            if name:
-                                self.discovered_params[name] = {
-                                    'type': inp.get_attribute('type') or 'text',
-                                    'url': url
-                                }
+                # Only follow same-domain links, deduplicated in discovery order so the
+                # max_pages cut-off picks the same pages on every run
+                same_domain = list(dict.fromkeys(
+                    u for u in (urljoin(base_url, link) for link in links)
+                    if urlparse(u).netloc == base_netloc
+                ))
+                state.urls.update(same_domain)
+                new_urls = [u for u in same_domain if u not in queued]
+                queued.update(new_urls)
+                to_visit.extend(new_urls)
                 
-                except Exception as e:
-                    print(f"Error crawling {url}: {e}")
-                    continue
+                # Extract forms and parameters
+                inputs = page.query_selector_all('form input, form select, form textarea')
+                state.params.update({
+                    name: {'type': inp.get_attribute('type') or 'text', 'url': url}
+                    for inp in inputs
+                    if (name := inp.get_attribute('name'))
+                })
             
-            browser.close()
+            except Exception as e:
+                print(f"Error crawling {url}: {e}")
+                continue
+        
+        context.close()
         
-        print(f"Crawled {len(visited)} pages, discovered {len(self.discovered_urls)} URLs")
+        print(f"Crawled {len(visited)} pages, discovered {len(state.urls)} URLs")
     
-    def fingerprint_technologies(self, url: str):
+    def fingerprint_technologies(self, url: str, state: ScanState):
         """Detect technologies used by the target"""
         print(f"Fingerprinting {url}")
         
         try:
-            response = requests.get(url, timeout=10)
-            headers = response.headers
-            content = response.text
+            with requests.get(url, timeout=10, stream=True) as response:
+                headers = response.headers
+                buf = bytearray()
+                for chunk in response.iter_content(chunk_size=65536):
+                    buf += chunk
+                    if len(buf) >= _FINGERPRINT_MAX_BYTES:
+                        break
+            content = buf[:_FINGERPRINT_MAX_BYTES].decode(response.encoding or "utf-8", "ignore")
             
             # Check server header
             if 'Server' in headers:
-                self.technologies.append({
+                state.techs.append({
                     'type': 'server',
                     'name': headers['Server']
                 })
             
             # Check for common frameworks
             if 'X-Powered-By' in headers:
-                self.technologies.append({
+                state.techs.append({
                     'type': 'framework',
                     'name': headers['X-Powered-By']
                 })
             
             # Check content for framework signatures
             if 'wp-content' in content or 'wp-includes' in content:
-                self.technologies.append({'type': 'cms', 'name': 'WordPress'})
+                state.techs.append({'type': 'cms', 'name': 'WordPress'})
             
             if 'Drupal' in content:
-                self.technologies.append({'type': 'cms', 'name': 'Drupal'})
+                state.techs.append({'type': 'cms', 'name': 'Drupal'})
             
             if 'django' in content.lower():
-                self.technologies.append({'type': 'framework', 'name': 'Django'})
+                state.techs.append({'type': 'framework', 'name': 'Django'})
             
             if 'react' in content.lower() or '_next' in content:
-                self.technologies.append({'type': 'frontend', 'name': 'React/Next.js'})
+                state.techs.append({'type': 'frontend', 'name': 'React/Next.js'})
             
-            print(f"Detected technologies: {self.technologies}")
+            print(f"Detected technologies: {state.techs}")
         
         except Exception as e:
             print(f"Error fingerprinting: {e}")
     
-    def discover_parameters(self, url: str):
+    def discover_parameters(self, url: str, state: ScanState):
         """Discover URL parameters"""
         parsed = urlparse(url)
         if parsed.query:
             from urllib.parse import parse_qs
             params = parse_qs(parsed.query)
             for param in params:
-                if param not in self.discovered_params:
-                    self.discovered_params[param] = {
+                if param not in state.params:
+                    state.params[param] = {
                         'type': 'query',
                         'url': url
                     }
     
-    def create_findings(self, session, job):
-        """Create findings based on discoveries"""
+    def create_findings(self, job, state: ScanState):
+        """Queue findings based on discoveries for a bulk insert"""
         # Example: Create info finding for discovered technologies
-        if self.technologies:
-            finding = Finding(
-                project_id=job.project_id,
-                job_id=job.id,
-                test_case_id=job.test_case_id,
-                title="Technologies Detected",
-                description=f"Detected the following technologies: {json.dumps(self.technologies, indent=2)}",
-                severity=FindingSeverity.INFO,
-                confidence=0.9,
-                status=FindingStatus.VALIDATED
-            )
-            session.add(finding)
-            session.commit()
+        if state.techs:
+            state.findings.append({
+                "project_id": job.project_id,
+                "job_id": job.id,
+                "test_case_id": job.test_case_id,
+                "title": "Technologies Detected",
+                "description": f"Detected the following technologies: {orjson.dumps(state.techs).decode()}",
+                "severity": FindingSeverity.INFO,
+                "confidence": 0.9,
+                "status": FindingStatus.VALIDATED
+            })
 
 def main():
     """Main entry point"""
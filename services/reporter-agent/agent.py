@@ -3,19 +3,121 @@ Reporter Agent - Generates comprehensive penetration testing reports
 """
 import os
 import sys
+import itertools
+from collections import Counter
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Iterable, Iterator
 from reportlab.lib.pagesizes import letter
 from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak, Flowable
 from reportlab.lib import colors
-from jinja2 import Template
+from sqlalchemy import func
+from sqlalchemy.orm import lazyload
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
 
 from shared.database import DatabaseManager, Project, Finding, Evidence
 from shared.config import settings
 from shared.storage import StorageManager
+from shared.templating import env, register_template
+
+HTML_REPORT_TEMPLATE = """
+<!DOCTYPE html>
+<html>
+<head>
+    <title>Penetration Testing Report - {{ project.name }}</title>
+    <style>
+        body { font-family: Arial, sans-serif; margin: 40px; }
+        h1 { color: #333; }
+        .finding { border: 1px solid #ddd; padding: 20px; margin: 20px 0; }
+        .critical { border-left: 5px solid #d32f2f; }
+        .high { border-left: 5px solid #f57c00; }
+        .medium { border-left: 5px solid #fbc02d; }
+        .low { border-left: 5px solid #388e3c; }
+        .info { border-left: 5px solid #1976d2; }
+        .severity { font-weight: bold; text-transform: uppercase; }
+    </style>
+</head>
+<body>
+    <h1>Penetration Testing Report</h1>
+    <h2>{{ project.name }}</h2>
+    
+    <h3>Executive Summary</h3>
+    <p>Total Findings: {{ total }}</p>
+    <ul>
+        <li>Critical: {{ counts['critical'] }}</li>
+        <li>High: {{ counts['high'] }}</li>
+        <li>Medium: {{ counts['medium'] }}</li>
+        <li>Low: {{ counts['low'] }}</li>
+        <li>Info: {{ counts['info'] }}</li>
+    </ul>
+    
+    <h3>Detailed Findings</h3>
+    {% for finding in findings %}
+    <div class="finding {{ finding.severity.value }}">
+        <h4>{{ loop.index }}. {{ finding.title }}</h4>
+        <p><span class="severity">Severity: {{ finding.severity.value }}</span></p>
+        <p><strong>Confidence:</strong> {{ (finding.confidence * 100)|round(1) }}%</p>
+        <p><strong>Status:</strong> {{ finding.status }}</p>
+        {% if finding.affected_url %}
+        <p><strong>Affected URL:</strong> {{ finding.affected_url }}</p>
+        {% endif %}
+        <p><strong>Description:</strong></p>
+        <p>{{ finding.description }}</p>
+        {% if finding.remediation %}
+        <p><strong>Remediation:</strong></p>
+        <p>{{ finding.remediation }}</p>
+        {% endif %}
+    </div>
+    {% endfor %}
+</body>
+</html>
+"""
+
+register_template("report.html", HTML_REPORT_TEMPLATE)
+
+# Report uploads are read from disk through a 1 MiB buffer and sent in 16 MiB parts
+REPORT_UPLOAD_BUFFER = 1 << 20
+REPORT_UPLOAD_PART_SIZE = 16 * 1024 * 1024
+
+# Severity values in report order, with their display labels
+SEVERITY_LABELS = (
+    ("critical", "Critical"),
+    ("high", "High"),
+    ("medium", "Medium"),
+    ("low", "Low"),
+    ("info", "Info"),
+)
+
+def _severity_counts(session, project_id: str) -> Counter:
+    """Count a project's findings per severity value with one GROUP BY query"""
+    rows = (
+        session.query(Finding.severity, func.count())
+        .filter(Finding.project_id == project_id)
+        .group_by(Finding.severity)
+        .all()
+    )
+    return Counter({severity.value: count for severity, count in rows})
+
+class _FlowableStream(list):
+    """List that lazily pulls flowables from an iterable as ReportLab consumes it.
+
+    ``BaseDocTemplate.build`` checks ``len()`` on every iteration and deletes
+    handled flowables from the front, so refilling here keeps at most
+    ``window`` flowables resident instead of the whole story.
+    """
+    
+    def __init__(self, flowables: Iterable[Flowable], window: int = 256):
+        super().__init__()
+        self._source = iter(flowables)
+        self._window = window
+    
+    def __len__(self):
+        size = super().__len__()
+        if size < self._window:
+            self.extend(itertools.islice(self._source, self._window - size))
+            size = super().__len__()
+        return size
 
 class ReporterAgent:
     """Generates penetration testing reports"""
@@ -26,149 +128,104 @@ class ReporterAgent:
     
     def execute(self, project_id: str, format: str = 'pdf'):
         """Generate report for a project"""
-        session = next(self.db_manager.get_session())
-        try:
-            project = session.query(Project).filter(Project.id == project_id).first()
-            if not project:
-                print(f"Project {project_id} not found")
-                return
-            
-            findings = session.query(Finding).filter(Finding.project_id == project_id).all()
-            
-            print(f"Generating {format} report for project: {project.name}")
-            
-            if format == 'pdf':
-                report_path = self.generate_pdf_report(project, findings)
-            elif format == 'html':
-                report_path = self.generate_html_report(project, findings)
-            else:
-                print(f"Unsupported format: {format}")
-                return
-            
-            # Upload report to storage
-            with open(report_path, 'rb') as f:
+        with self.db_manager.session_scope() as session:
+            try:
+                project = session.query(Project).filter(Project.id == project_id).first()
+                if not project:
+                    print(f"Project {project_id} not found")
+                    return
+                
+                # Summary counts come from SQL; detailed rows are streamed in batches.
+                # The report renders neither evidence nor votes, so neither is loaded
+                counts = _severity_counts(session, project_id)
+                findings = (
+                    session.query(Finding)
+                    .options(lazyload(Finding.evidence), lazyload(Finding.votes))
+                    .filter(Finding.project_id == project_id)
+                    .order_by(Finding.severity, Finding.id)
+                    .execution_options(stream_results=True)
+                    .yield_per(500)
+                )
+                
+                print(f"Generating {format} report for project: {project.name}")
+                
+                if format == 'pdf':
+                    report_path = self.generate_pdf_report(project, findings, counts)
+                elif format == 'html':
+                    report_path = self.generate_html_report(project, findings, counts)
+                else:
+                    print(f"Unsupported format: {format}")
+                    return
+                
+                # Upload report to storage, streaming it from disk in multipart chunks
                 storage_key = f"reports/{project_id}/report_{datetime.utcnow().isoformat()}.{format}"
-                self.storage_manager.upload_file(storage_key, f, os.path.getsize(report_path))
+                try:
+                    size = os.stat(report_path).st_size
+                    with open(report_path, 'rb', buffering=REPORT_UPLOAD_BUFFER) as f:
+                        self.storage_manager.upload_stream(storage_key, f, size, part_size=REPORT_UPLOAD_PART_SIZE)
+                finally:
+                    os.unlink(report_path)
+                
+                print(f"Report generated and uploaded: {storage_key}")
             
-            print(f"Report generated and uploaded: {storage_key}")
-        
-        except Exception as e:
-            print(f"Error generating report: {e}")
-        finally:
-            session.close()
+            except Exception as e:
+                print(f"Error generating report: {e}")
     
-    def generate_pdf_report(self, project: Project, findings: List[Finding]) -> str:
+    def generate_pdf_report(self, project: Project, findings: Iterable[Finding], counts: Counter) -> str:
         """Generate PDF report"""
         filename = f"/tmp/report_{project.id}.pdf"
         doc = SimpleDocTemplate(filename, pagesize=letter)
-        story = []
         styles = getSampleStyleSheet()
         
+        # Build PDF, materializing only a small window of flowables at a time
+        doc.build(_FlowableStream(self._pdf_story(project, findings, counts, styles)))
+        return filename
+    
+    def _pdf_story(self, project: Project, findings: Iterable[Finding], counts: Counter, styles) -> Iterator[Flowable]:
+        """Yield the PDF flowables one finding at a time"""
         # Title
-        title = Paragraph(f"<b>Penetration Testing Report</b><br/>{project.name}", styles['Title'])
-        story.append(title)
-        story.append(Spacer(1, 12))
+        yield Paragraph(f"<b>Penetration Testing Report</b><br/>{project.name}", styles['Title'])
+        yield Spacer(1, 12)
         
         # Executive Summary
-        story.append(Paragraph("<b>Executive Summary</b>", styles['Heading1']))
-        summary_text = f"""
-        This report presents the findings from the automated penetration testing assessment 
-        of {project.name}. The assessment was conducted using Apex Pentest X platform.
-        <br/><br/>
-        Total Findings: {len(findings)}<br/>
-        Critical: {sum(1 for f in findings if f.severity.value == 'critical')}<br/>
-        High: {sum(1 for f in findings if f.severity.value == 'high')}<br/>
-        Medium: {sum(1 for f in findings if f.severity.value == 'medium')}<br/>
-        Low: {sum(1 for f in findings if f.severity.value == 'low')}<br/>
-        Info: {sum(1 for f in findings if f.severity.value == 'info')}
-        """
-        story.append(Paragraph(summary_text, styles['Normal']))
-        story.append(Spacer(1, 12))
+        yield Paragraph("<b>Executive Summary</b>", styles['Heading1'])
+        summary_text = (
+            f"This report presents the findings from the automated penetration testing assessment "
+            f"of {project.name}. The assessment was conducted using Apex Pentest X platform.<br/><br/>"
+            f"Total Findings: {sum(counts.values())}<br/>"
+            + "<br/>".join(f"{label}: {counts[severity]}" for severity, label in SEVERITY_LABELS)
+        )
+        yield Paragraph(summary_text, styles['Normal'])
+        yield Spacer(1, 12)
         
         # Findings
-        story.append(PageBreak())
-        story.append(Paragraph("<b>Detailed Findings</b>", styles['Heading1']))
+        yield PageBreak()
+        yield Paragraph("<b>Detailed Findings</b>", styles['Heading1'])
         
         for i, finding in enumerate(findings, 1):
-            story.append(Spacer(1, 12))
-            story.append(Paragraph(f"<b>Finding {i}: {finding.title}</b>", styles['Heading2']))
-            story.append(Paragraph(f"<b>Severity:</b> {finding.severity.value.upper()}", styles['Normal']))
-            story.append(Paragraph(f"<b>Confidence:</b> {finding.confidence * 100:.1f}%", styles['Normal']))
-            story.append(Paragraph(f"<b>Status:</b> {finding.status.value}", styles['Normal']))
+            yield Spacer(1, 12)
+            yield Paragraph(f"<b>Finding {i}: {finding.title}</b>", styles['Heading2'])
+            yield Paragraph(f"<b>Severity:</b> {finding.severity.value.upper()}", styles['Normal'])
+            yield Paragraph(f"<b>Confidence:</b> {finding.confidence * 100:.1f}%", styles['Normal'])
+            yield Paragraph(f"<b>Status:</b> {finding.status}", styles['Normal'])
             
             if finding.affected_url:
-                story.append(Paragraph(f"<b>Affected URL:</b> {finding.affected_url}", styles['Normal']))
+                yield Paragraph(f"<b>Affected URL:</b> {finding.affected_url}", styles['Normal'])
             
-            story.append(Paragraph(f"<b>Description:</b>", styles['Normal']))
-            story.append(Paragraph(finding.description, styles['Normal']))
+            yield Paragraph(f"<b>Description:</b>", styles['Normal'])
+            yield Paragraph(finding.description, styles['Normal'])
             
             if finding.remediation:
-                story.append(Paragraph(f"<b>Remediation:</b>", styles['Normal']))
-                story.append(Paragraph(finding.remediation, styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        return filename
+                yield Paragraph(f"<b>Remediation:</b>", styles['Normal'])
+                yield Paragraph(finding.remediation, styles['Normal'])
     
-    def generate_html_report(self, project: Project, findings: List[Finding]) -> str:
+    def generate_html_report(self, project: Project, findings: Iterable[Finding], counts: Counter) -> str:
         """Generate HTML report"""
         filename = f"/tmp/report_{project.id}.html"
         
-        template_str = """
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <title>Penetration Testing Report - {{ project.name }}</title>
-            <style>
-                body { font-family: Arial, sans-serif; margin: 40px; }
-                h1 { color: #333; }
-                .finding { border: 1px solid #ddd; padding: 20px; margin: 20px 0; }
-                .critical { border-left: 5px solid #d32f2f; }
-                .high { border-left: 5px solid #f57c00; }
-                .medium { border-left: 5px solid #fbc02d; }
-                .low { border-left: 5px solid #388e3c; }
-                .info { border-left: 5px solid #1976d2; }
-                .severity { font-weight: bold; text-transform: uppercase; }
-            </style>
-        </head>
-        <body>
-            <h1>Penetration Testing Report</h1>
-            <h2>{{ project.name }}</h2>
-            
-            <h3>Executive Summary</h3>
-            <p>Total Findings: {{ findings|length }}</p>
-            <ul>
-                <li>Critical: {{ findings|selectattr('severity.value', 'equalto', 'critical')|list|length }}</li>
-                <li>High: {{ findings|selectattr('severity.value', 'equalto', 'high')|list|length }}</li>
-                <li>Medium: {{ findings|selectattr('severity.value', 'equalto', 'medium')|list|length }}</li>
-                <li>Low: {{ findings|selectattr('severity.value', 'equalto', 'low')|list|length }}</li>
-                <li>Info: {{ findings|selectattr('severity.value', 'equalto', 'info')|list|length }}</li>
-            </ul>
-            
-            <h3>Detailed Findings</h3>
-            {% for finding in findings %}
-            <div class="finding {{ finding.severity.value }}">
-                <h4>{{ loop.index }}. {{ finding.title }}</h4>
-                <p><span class="severity">Severity: {{ finding.severity.value }}</span></p>
-                <p><strong>Confidence:</strong> {{ (finding.confidence * 100)|round(1) }}%</p>
-                <p><strong>Status:</strong> {{ finding.status.value }}</p>
-                {% if finding.affected_url %}
-                <p><strong>Affected URL:</strong> {{ finding.affected_url }}</p>
-                {% endif %}
-                <p><strong>Description:</strong></p>
-                <p>{{ finding.description }}</p>
-                {% if finding.remediation %}
-                <p><strong>Remediation:</strong></p>
-                <p>{{ finding.remediation }}</p>
-                {% endif %}
-            </div>
-            {% endfor %}
-        </body>
-        </html>
-        """
-        
-        template = Template(template_str)
-        html_content = template.render(project=project, findings=findings)
+        html_content = env.get_template("report.html").render(
+            project=project, findings=findings, counts=counts, total=sum(counts.values())
+        )
         
         with open(filename, 'w') as f:
             f.write(html_content)
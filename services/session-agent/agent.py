@@ -4,8 +4,11 @@ Session Agent - Manages browser sessions, login workflows, and token extraction
 import os
 import sys
 import json
-from typing import Dict, Any, Optional
-from playwright.sync_api import sync_playwright, Page
+import re
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, FrozenSet, List, Optional, Pattern
+from playwright.sync_api import sync_playwright, Browser, Page
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
 
@@ -13,6 +16,31 @@ from shared.database import DatabaseManager, Job, JobStatus, Credential
 from shared.config import settings
 from shared.security import decrypt_credential
 
+# Upper bound on concurrent credential probes (one browser per worker)
+MAX_CREDENTIAL_WORKERS = 8
+
+@lru_cache(maxsize=64)
+def _indicator_regex(indicators: FrozenSet[str]) -> Optional[Pattern[str]]:
+    """Compile a case-insensitive pattern matching any of the indicators
+    
+    Returns None for an empty set, which matches nothing (an empty
+    alternation would match every page).
+    """
+    if not indicators:
+        return None
+    return re.compile("|".join(re.escape(ind) for ind in indicators), re.IGNORECASE)
+
+# Common CSRF token locations, matched in one DOM pass
+_CSRF_SELECTOR = ", ".join([
+    "input[name='csrf_token']",
+    "input[name='_csrf']",
+    "input[name='csrfmiddlewaretoken']",
+    "meta[name='csrf-token']"
+])
+
+_SUCCESS_RE = _indicator_regex(frozenset({"dashboard", "logout", "profile", "welcome"}))
+_FAILURE_RE = _indicator_regex(frozenset({"invalid", "incorrect", "failed", "error"}))
+
 class SessionAgent:
     """Manages browser sessions and authentication workflows"""
     
@@ -22,207 +50,204 @@ class SessionAgent:
     
     def execute(self, job_id: str):
         """Execute session management job"""
-        session = next(self.db_manager.get_session())
-        try:
-            job = session.query(Job).filter(Job.id == job_id).first()
-            if not job:
-                print(f"Job {job_id} not found")
-                return
-            
-            # Get credentials for the project
-            credentials = session.query(Credential).filter(
-                Credential.project_id == job.project_id
-            ).all()
-            
-            if not credentials:
-                print("No credentials found for project")
+        with self.db_manager.session_scope() as session:
+            try:
+                job = session.query(Job).filter(Job.id == job_id).first()
+                if not job:
+                    print(f"Job {job_id} not found")
+                    return
+                
+                # Get credentials for the project
+                credentials = session.query(Credential).filter(
+                    Credential.project_id == job.project_id
+                ).all()
+                
+                if not credentials:
+                    print("No credentials found for project")
+                    job.status = JobStatus.COMPLETED
+                    job.result = {"message": "No credentials to test"}
+                    session.commit()
+                    return
+                
+                # Test credentials concurrently, striping them across workers
+                workers = min(MAX_CREDENTIAL_WORKERS, len(credentials))
+                batches = [credentials[i::workers] for i in range(workers)]
+                results: List[Dict[str, Any]] = [None] * len(credentials)
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    for i, batch_results in enumerate(executor.map(self.test_credentials, batches)):
+                        results[i::workers] = batch_results
+                
                 job.status = JobStatus.COMPLETED
-                job.result = {"message": "No credentials to test"}
+                job.result = {
+                    "credentials_tested": len(credentials),
+                    "successful_logins": sum(1 for r in results if r.get("success")),
+                    "results": results
+                }
                 session.commit()
-                return
-            
-            # Test each credential
-            results = []
-            for cred in credentials:
-                result = self.test_credential(cred)
-                results.append(result)
-            
-            job.status = JobStatus.COMPLETED
-            job.result = {
-                "credentials_tested": len(credentials),
-                "successful_logins": sum(1 for r in results if r.get("success")),
-                "results": results
-            }
-            session.commit()
+                
+                print(f"Session agent completed for job {job_id}")
             
-            print(f"Session agent completed for job {job_id}")
-        
-        except Exception as e:
-            print(f"Error executing session agent: {e}")
-            job.status = JobStatus.FAILED
-            job.error_message = str(e)
-            session.commit()
-        finally:
-            session.close()
+            except Exception as e:
+                print(f"Error executing session agent: {e}")
+                job.status = JobStatus.FAILED
+                job.error_message = str(e)
+                session.commit()
+    
+    def test_credentials(self, credentials: List[Credential]) -> List[Dict[str, Any]]:
+        """Test a batch of credentials, sharing one browser across the batch"""
+        # Playwright's sync API is bound to the thread that started it, so
+        # each worker launches its own browser
+        with sync_playwright() as p:
+            browser = p.chromium.launch(headless=True)
+            try:
+                return [self.test_credential(browser, cred) for cred in credentials]
+            finally:
+                browser.close()
     
-    def test_credential(self, credential: Credential) -> Dict[str, Any]:
+    def test_credential(self, browser: Browser, credential: Credential) -> Dict[str, Any]:
         """Test a credential by attempting login"""
         try:
-            # Decrypt credential
-            cred_data = decrypt_credential(credential.encrypted_payload)
+            cred_data = self.get_credential_data(credential)
             
             if credential.type == "form":
-                return self.test_form_login(cred_data)
+                return self.test_form_login(browser, cred_data)
             elif credential.type == "basic":
-                return self.test_basic_auth(cred_data)
+                return self.test_basic_auth(browser, cred_data)
             elif credential.type == "oauth":
-                return self.test_oauth(cred_data)
+                return self.test_oauth(browser, cred_data)
             else:
                 return {"success": False, "error": "Unsupported credential type"}
         
         except Exception as e:
             return {"success": False, "error": str(e)}
     
-    def test_form_login(self, cred_data: Dict[str, Any]) -> Dict[str, Any]:
+    def get_credential_data(self, credential: Credential) -> Dict[str, Any]:
+        """Decrypt and parse a credential payload; each credential is tested once per job"""
+        return json.loads(decrypt_credential(credential.encrypted_payload))
+    
+    def test_form_login(self, browser: Browser, cred_data: Dict[str, Any]) -> Dict[str, Any]:
         """Test form-based login"""
         print(f"Testing form login at {cred_data.get('url')}")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
+        context = browser.new_context()
+        page = context.new_page()
+        
+        try:
+            # Navigate to login page
+            page.goto(cred_data.get("url"), timeout=10000)
             
-            try:
-                # Navigate to login page
-                page.goto(cred_data.get("url"), timeout=10000)
-                
-                # Fill in credentials
-                username_selector = cred_data.get("username_selector", "input[name='username']")
-                password_selector = cred_data.get("password_selector", "input[name='password']")
-                submit_selector = cred_data.get("submit_selector", "button[type='submit']")
-                
-                page.fill(username_selector, cred_data.get("username", ""))
-                page.fill(password_selector, cred_data.get("password", ""))
-                page.click(submit_selector)
-                
-                # Wait for navigation
-                page.wait_for_load_state("networkidle", timeout=5000)
-                
-                # Extract session tokens
-                cookies = context.cookies()
-                csrf_token = self.extract_csrf_token(page)
-                
-                # Check if login was successful
-                success = self.check_login_success(page, cred_data)
-                
-                return {
-                    "success": success,
-                    "cookies": [{"name": c["name"], "value": c["value"]} for c in cookies],
-                    "csrf_token": csrf_token,
-                    "url": page.url
-                }
+            # Fill in credentials
+            username_selector = cred_data.get("username_selector", "input[name='username']")
+            password_selector = cred_data.get("password_selector", "input[name='password']")
+            submit_selector = cred_data.get("submit_selector", "button[type='submit']")
             
-            except Exception as e:
-                return {"success": False, "error": str(e)}
-            finally:
-                browser.close()
+            page.fill(username_selector, cred_data.get("username", ""))
+            page.fill(password_selector, cred_data.get("password", ""))
+            page.click(submit_selector)
+            
+            # Wait for navigation
+            page.wait_for_load_state("networkidle", timeout=5000)
+            
+            # Extract session tokens
+            cookies = context.cookies()
+            csrf_token = self.extract_csrf_token(page)
+            
+            # Check if login was successful
+            success = self.check_login_success(page, cred_data)
+            
+            return {
+                "success": success,
+                "cookies": [{"name": c["name"], "value": c["value"]} for c in cookies],
+                "csrf_token": csrf_token,
+                "url": page.url
+            }
+        
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            context.close()
     
-    def test_basic_auth(self, cred_data: Dict[str, Any]) -> Dict[str, Any]:
+    def test_basic_auth(self, browser: Browser, cred_data: Dict[str, Any]) -> Dict[str, Any]:
         """Test HTTP Basic Authentication"""
         print(f"Testing basic auth at {cred_data.get('url')}")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context(
-                http_credentials={
-                    "username": cred_data.get("username", ""),
-                    "password": cred_data.get("password", "")
-                }
-            )
-            page = context.new_page()
-            
-            try:
-                response = page.goto(cred_data.get("url"), timeout=10000)
-                success = response.status == 200
-                
-                return {
-                    "success": success,
-                    "status_code": response.status,
-                    "url": page.url
-                }
+        context = browser.new_context(
+            http_credentials={
+                "username": cred_data.get("username", ""),
+                "password": cred_data.get("password", "")
+            }
+        )
+        page = context.new_page()
+        
+        try:
+            response = page.goto(cred_data.get("url"), timeout=10000)
+            success = response.status == 200
             
-            except Exception as e:
-                return {"success": False, "error": str(e)}
-            finally:
-                browser.close()
+            return {
+                "success": success,
+                "status_code": response.status,
+                "url": page.url
+            }
+        
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            context.close()
     
-    def test_oauth(self, cred_data: Dict[str, Any]) -> Dict[str, Any]:
+    def test_oauth(self, browser: Browser, cred_data: Dict[str, Any]) -> Dict[str, Any]:
         """Test OAuth authentication"""
         print(f"Testing OAuth at {cred_data.get('url')}")
         
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=True)
-            context = browser.new_context()
-            page = context.new_page()
+        context = browser.new_context()
+        page = context.new_page()
+        
+        try:
+            # Navigate to OAuth authorization URL
+            auth_url = cred_data.get("auth_url")
+            if not auth_url:
+                return {"success": False, "error": "No auth_url provided"}
             
-            try:
-                # Navigate to OAuth authorization URL
-                auth_url = cred_data.get("auth_url")
-                if not auth_url:
-                    return {"success": False, "error": "No auth_url provided"}
-                
-                page.goto(auth_url, timeout=10000)
-                
-                # Fill in OAuth credentials if login page is shown
-                if "login" in page.url.lower() or "signin" in page.url.lower():
-                    username_selector = cred_data.get("username_selector", "input[name='username']")
-                    password_selector = cred_data.get("password_selector", "input[name='password']")
-                    
-                    page.fill(username_selector, cred_data.get("username", ""))
-                    page.fill(password_selector, cred_data.get("password", ""))
-                    page.click("button[type='submit']")
-                    
-                    page.wait_for_load_state("networkidle", timeout=5000)
-                
-                # Check for authorization success
-                success = "code=" in page.url or "access_token=" in page.url
+            page.goto(auth_url, timeout=10000)
+            
+            # Fill in OAuth credentials if login page is shown
+            if "login" in page.url.lower() or "signin" in page.url.lower():
+                username_selector = cred_data.get("username_selector", "input[name='username']")
+                password_selector = cred_data.get("password_selector", "input[name='password']")
                 
-                # Extract tokens if present
-                tokens = {}
-                if "access_token=" in page.url:
-                    import re
-                    token_match = re.search(r'access_token=([^&]+)', page.url)
-                    if token_match:
-                        tokens["access_token"] = token_match.group(1)
+                page.fill(username_selector, cred_data.get("username", ""))
+                page.fill(password_selector, cred_data.get("password", ""))
+                page.click("button[type='submit']")
                 
-                return {
-                    "success": success,
-                    "tokens": tokens,
-                    "redirect_url": page.url
-                }
+                page.wait_for_load_state("networkidle", timeout=5000)
             
-            except Exception as e:
-                return {"success": False, "error": str(e)}
-            finally:
-                browser.close()
+            # Check for authorization success
+            success = "code=" in page.url or "access_token=" in page.url
+            
+            # Extract tokens if present
+            tokens = {}
+            if "access_token=" in page.url:
+                token_match = re.search(r'access_token=([^&]+)', page.url)
+                if token_match:
+                    tokens["access_token"] = token_match.group(1)
+            
+            return {
+                "success": success,
+                "tokens": tokens,
+                "redirect_url": page.url
+            }
+        
+        except Exception as e:
+            return {"success": False, "error": str(e)}
+        finally:
+            context.close()
     
     def extract_csrf_token(self, page: Page) -> Optional[str]:
         """Extract CSRF token from page"""
         try:
-            # Try common CSRF token locations
-            selectors = [
-                "input[name='csrf_token']",
-                "input[name='_csrf']",
-                "input[name='csrfmiddlewaretoken']",
-                "meta[name='csrf-token']"
-            ]
-            
-            for selector in selectors:
-                element = page.query_selector(selector)
-                if element:
-                    value = element.get_attribute("value") or element.get_attribute("content")
-                    if value:
-                        return value
+            # Query all common CSRF token locations in a single round trip
+            element = page.query_selector(_CSRF_SELECTOR)
+            if element:
+                return element.get_attribute("value") or element.get_attribute("content")
             
             return None
         
@@ -232,20 +257,17 @@ class SessionAgent:
     def check_login_success(self, page: Page, cred_data: Dict[str, Any]) -> bool:
         """Check if login was successful"""
         # Check for success indicators
-        success_indicators = cred_data.get("success_indicators", [
-            "dashboard", "logout", "profile", "welcome"
-        ])
+        # (an explicit empty list means no success indicators, not the defaults)
+        success_indicators = cred_data.get("success_indicators")
+        success_re = _SUCCESS_RE if success_indicators is None else _indicator_regex(frozenset(success_indicators))
         
-        page_content = page.content().lower()
-        for indicator in success_indicators:
-            if indicator.lower() in page_content:
-                return True
+        page_content = page.content()
+        if success_re is not None and success_re.search(page_content):
+            return True
         
         # Check for failure indicators
-        failure_indicators = ["invalid", "incorrect", "failed", "error"]
-        for indicator in failure_indicators:
-            if indicator in page_content:
-                return False
+        if _FAILURE_RE is not None and _FAILURE_RE.search(page_content):
+            return False
         
         # If no clear indicators, assume success if we're on a different page
         return page.url != cred_data.get("url")
@@ -2,25 +2,39 @@
 Agent communication protocol
 """
 from typing import Dict, Any, Optional, Literal
-from datetime import datetime
+from datetime import datetime, timezone
+from uuid import UUID, uuid4
+import time
+import msgspec
+import orjson
 from pydantic import BaseModel, Field
-import uuid
+from pydantic.dataclasses import dataclass
 
 MessageType = Literal["proposal", "vote", "result", "heartbeat", "request", "response"]
 
-class AgentMessage(BaseModel):
-    """Standard message envelope for agent communication"""
-    msg_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+@dataclass(slots=True, kw_only=True)
+class AgentMessage:
+    """Standard message envelope for agent communication
+    
+    Two are created per agent per debate round, so it is a slotted pydantic
+    dataclass: fields are still validated on construction, but instances
+    carry no per-instance __dict__.
+    """
+    msg_id: UUID = Field(default_factory=uuid4)
     from_agent: str
     to_agent: str  # Can be specific agent ID or "all" for broadcast
     type: MessageType
     payload: Dict[str, Any]
-    timestamp: datetime = Field(default_factory=datetime.utcnow)
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    
+    def encode(self) -> bytes:
+        """Encode the message as JSON with orjson, which serializes dataclasses, UUIDs and datetimes natively"""
+        return orjson.dumps(self)
     
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    @classmethod
+    def decode(cls, data: bytes) -> "AgentMessage":
+        """Decode and validate a JSON message"""
+        return cls(**orjson.loads(data))
 
 class ProposalMessage(BaseModel):
     """Proposal for a finding or action"""
@@ -31,7 +45,8 @@ class ProposalMessage(BaseModel):
     confidence: float
     evidence: list = []
 
-class VoteMessage(BaseModel):
+@dataclass(slots=True, kw_only=True)
+class VoteMessage:
     """Vote on a finding"""
     finding_id: str
     vote: Literal["accept", "reject", "more_info"]
@@ -45,13 +60,30 @@ class ResultMessage(BaseModel):
     data: Dict[str, Any]
     error: Optional[str] = None
 
-class HeartbeatMessage(BaseModel):
-    """Agent heartbeat"""
+class HeartbeatMessage(msgspec.Struct, frozen=True):
+    """Agent heartbeat
+    
+    Sent at high frequency by every agent, so it is a msgspec Struct rather
+    than a pydantic model: construction and encoding skip validation.
+    """
     agent_id: str
     status: str
     current_job: Optional[str] = None
     memory_usage_mb: Optional[float] = None
     cpu_usage_percent: Optional[float] = None
+    ts: float = msgspec.field(default_factory=time.time)  # Epoch seconds; callers in tight loops can pass a pre-stamped value
+    
+    def encode(self) -> bytes:
+        """Encode the heartbeat as JSON"""
+        return _HEARTBEAT_ENCODER.encode(self)
+    
+    @classmethod
+    def decode(cls, data: bytes) -> "HeartbeatMessage":
+        """Decode a JSON heartbeat"""
+        return _HEARTBEAT_DECODER.decode(data)
+
+_HEARTBEAT_ENCODER = msgspec.json.Encoder()
+_HEARTBEAT_DECODER = msgspec.json.Decoder(HeartbeatMessage)
 
 class RequestMessage(BaseModel):
     """Request for information or action"""
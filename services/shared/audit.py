@@ -1,18 +1,25 @@
 """
 Audit logging for user actions
 """
-from datetime import datetime
-from typing import Optional, Dict, Any
-import uuid
-from sqlalchemy import Column, String, DateTime, Boolean
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, List
+import atexit
+import queue
+import threading
+import time
+from sqlalchemy import Column, String, DateTime, Boolean, Index, func, text
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from .database import Base, DatabaseManager
 
 class AuditLog(Base):
     """Audit log entry for user actions"""
     __tablename__ = "audit_logs"
+    __table_args__ = (
+        Index("idx_audit_logs_user_time", "user_id", "timestamp"),
+        Index("idx_audit_logs_resource", "resource_type", "resource_id"),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     user_id = Column(String(255), nullable=False)
     action = Column(String(100), nullable=False)
     resource_type = Column(String(50))
@@ -20,14 +27,31 @@ class AuditLog(Base):
     details = Column(JSONB)
     ip_address = Column(String(45))
     user_agent = Column(String(512))
-    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+    # Part of the key because audit_logs is range-partitioned by month on timestamp
+    timestamp = Column(DateTime, primary_key=True, server_default=func.now())
     success = Column(Boolean, nullable=False, default=True)
 
+# Columns loaded by the background writer; id comes from the gen_random_uuid() default
+AUDIT_LOG_COPY_COLUMNS = (
+    "user_id", "action", "resource_type", "resource_id", "details",
+    "ip_address", "user_agent", "success", "timestamp",
+)
+
 class AuditLogger:
-    """Helper class for audit logging"""
+    """Helper class for audit logging
+    
+    Entries are queued by ``log`` and written by a background thread in
+    batches of up to ``batch_size`` rows, one commit per batch.
+    """
     
-    def __init__(self, db_manager: DatabaseManager):
+    def __init__(self, db_manager: DatabaseManager, batch_size: int = 500, flush_interval: float = 0.25):
         self.db_manager = db_manager
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        self._writer = threading.Thread(target=self._run, name="audit-log-writer", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
     
     def log(
         self,
@@ -40,26 +64,49 @@ class AuditLogger:
         user_agent: Optional[str] = None,
         success: bool = True
     ):
-        """Log a user action"""
-        session = next(self.db_manager.get_session())
+        """Queue a user action for the background writer"""
+        # Stamped here rather than by the server default, since the row is
+        # written up to flush_interval later
+        self._queue.put({
+            "user_id": user_id,
+            "action": action,
+            "resource_type": resource_type,
+            "resource_id": resource_id,
+            "details": details,
+            "ip_address": ip_address,
+            "user_agent": user_agent,
+            "success": success,
+            "timestamp": datetime.now(timezone.utc)
+        })
+    
+    def flush(self):
+        """Block until every queued entry has been written"""
+        self._queue.join()
+    
+    def _run(self):
+        """Drain the queue, writing up to batch_size entries per flush_interval"""
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=timeout))
+                except queue.Empty:
+                    break
+            
+            self._write_batch(batch)
+            for _ in batch:
+                self._queue.task_done()
+    
+    def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Load a batch of entries with a single COPY"""
         try:
-            log_entry = AuditLog(
-                user_id=user_id,
-                action=action,
-                resource_type=resource_type,
-                resource_id=resource_id,
-                details=details,
-                ip_address=ip_address,
-                user_agent=user_agent,
-                success=success
-            )
-            session.add(log_entry)
-            session.commit()
+            self.db_manager.copy_rows("audit_logs", AUDIT_LOG_COPY_COLUMNS, batch)
         except Exception as e:
-            print(f"Failed to write audit log: {e}")
-            session.rollback()
-        finally:
-            session.close()
+            print(f"Failed to write {len(batch)} audit log entries: {e}")
     
     def log_login(self, user_id: str, ip_address: str, success: bool = True):
         """Log a login attempt"""
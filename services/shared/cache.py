@@ -0,0 +1,50 @@
+"""
+Small in-process TTL cache
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Hashable, Optional
+
+class TTLCache:
+    """Thread-safe mapping whose entries expire after a time-to-live
+    
+    Once ``maxsize`` entries are held, the oldest entry is evicted on insert.
+    """
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the cached value, or None if it is missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Cache a value for ttl seconds (defaults to the cache's ttl)"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data.pop(key, None)
+            while len(self._data) >= self.maxsize:
+                self._data.popitem(last=False)
+            self._data[key] = (value, expires_at)
+    
+    def pop(self, key: Hashable):
+        """Drop a cached entry if present"""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self):
+        """Drop all cached entries"""
+        with self._lock:
+            self._data.clear()
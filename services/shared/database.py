@@ -1,15 +1,22 @@
 """
 Shared database models and connection management for Apex Pentest X
 """
+from contextlib import contextmanager
+from functools import lru_cache
+import io
+import threading
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Mapping, Sequence, Tuple
 from enum import Enum
-import uuid
 
-from sqlalchemy import create_engine, Column, String, Integer, DateTime, Boolean, JSON, ForeignKey, Text, Float, Enum as SQLEnum
+import orjson
+from sqlalchemy import create_engine, event, insert, select, text, Column, String, Integer, DateTime, Boolean, ForeignKey, Text, Float, Index, CheckConstraint, Enum as SQLEnum
+from sqlalchemy.engine import Engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import sessionmaker, scoped_session, relationship, selectinload
+from sqlalchemy.pool import QueuePool
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 
 Base = declarative_base()
 
@@ -75,14 +82,19 @@ class VoteType(str, Enum):
     MORE_INFO = "more_info"
 
 # Models
+def _enum_check(column: str, enum_cls, name: str) -> CheckConstraint:
+    """CHECK constraint restricting a String column to an enum's values"""
+    values = ", ".join(f"'{member.value}'" for member in enum_cls)
+    return CheckConstraint(f"{column} IN ({values})", name=name)
+
 class Project(Base):
     __tablename__ = "projects"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     name = Column(String(255), nullable=False)
     owner_id = Column(String(255), nullable=False)
     description = Column(Text, nullable=True)
-    settings = Column(JSON, nullable=False, default={})
+    settings = Column(JSONB, nullable=False, default=dict)
     status = Column(SQLEnum(ProjectStatus), nullable=False, default=ProjectStatus.CREATED)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -96,11 +108,11 @@ class Project(Base):
 class Target(Base):
     __tablename__ = "targets"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
     type = Column(SQLEnum(TargetType), nullable=False)
     value = Column(String(1024), nullable=False)
-    scope_rules = Column(JSON, nullable=False, default={})
+    scope_rules = Column(JSONB, nullable=False, default=dict)
     status = Column(SQLEnum(TargetStatus), nullable=False, default=TargetStatus.PENDING)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
@@ -111,12 +123,12 @@ class Target(Base):
 class Credential(Base):
     __tablename__ = "credentials"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
     target_id = Column(UUID(as_uuid=True), ForeignKey("targets.id"), nullable=True)
     type = Column(SQLEnum(CredentialType), nullable=False)
     encrypted_payload = Column(Text, nullable=False)
-    extra = Column("metadata", JSON, nullable=False, default={})
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
@@ -126,7 +138,7 @@ class Credential(Base):
 class TestCase(Base):
     __tablename__ = "test_cases"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     wstg_id = Column(String(50), nullable=False, unique=True)
     title = Column(String(255), nullable=False)
     description = Column(Text, nullable=False)
@@ -134,7 +146,7 @@ class TestCase(Base):
     automatable = Column(Boolean, nullable=False, default=True)
     assigned_agent = Column(String(100), nullable=True)
     priority = Column(Integer, nullable=False, default=5)
-    extra = Column("metadata", JSON, nullable=False, default={})
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
@@ -142,20 +154,28 @@ class TestCase(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        _enum_check("status", JobStatus, "ck_jobs_status"),
+        Index(
+            "idx_jobs_queued_priority", text("priority DESC"), "created_at",
+            postgresql_include=["agent_id", "test_case_id"],
+            postgresql_where=text("status = 'queued'")
+        ),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
     test_case_id = Column(UUID(as_uuid=True), ForeignKey("test_cases.id"), nullable=False)
     agent_id = Column(String(100), nullable=False)
-    status = Column(SQLEnum(JobStatus), nullable=False, default=JobStatus.QUEUED)
+    status = Column(String(16), nullable=False, default=JobStatus.QUEUED.value)
     priority = Column(Integer, nullable=False, default=5)
     retries = Column(Integer, nullable=False, default=0)
     max_retries = Column(Integer, nullable=False, default=3)
     eta = Column(DateTime, nullable=True)
     started_at = Column(DateTime, nullable=True)
     completed_at = Column(DateTime, nullable=True)
-    evidence_refs = Column(JSON, nullable=False, default=[])
-    result = Column(JSON, nullable=True)
+    evidence_refs = Column(JSONB, nullable=False, default=list)
+    result = Column(JSONB, nullable=True)
     error_message = Column(Text, nullable=True)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -167,8 +187,16 @@ class Job(Base):
 
 class Finding(Base):
     __tablename__ = "findings"
+    __table_args__ = (
+        Index("idx_findings_project_severity", "project_id", "severity"),
+        _enum_check("status", FindingStatus, "ck_findings_status"),
+        Index(
+            "idx_findings_open", "project_id", "severity",
+            postgresql_where=text("status IN ('tentative', 'validated')")
+        ),
+    )
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     project_id = Column(UUID(as_uuid=True), ForeignKey("projects.id"), nullable=False)
     job_id = Column(UUID(as_uuid=True), ForeignKey("jobs.id"), nullable=True)
     test_case_id = Column(UUID(as_uuid=True), ForeignKey("test_cases.id"), nullable=True)
@@ -178,12 +206,12 @@ class Finding(Base):
     cvss_score = Column(Float, nullable=True)
     cvss_vector = Column(String(255), nullable=True)
     confidence = Column(Float, nullable=False, default=0.5)
-    status = Column(SQLEnum(FindingStatus), nullable=False, default=FindingStatus.TENTATIVE)
+    status = Column(String(16), nullable=False, default=FindingStatus.TENTATIVE.value)
     affected_url = Column(String(2048), nullable=True)
     affected_parameter = Column(String(255), nullable=True)
     remediation = Column(Text, nullable=True)
-    references = Column(JSON, nullable=False, default=[])
-    extra = Column("metadata", JSON, nullable=False, default={})
+    references = Column(JSONB, nullable=False, default=list)
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     validated_at = Column(DateTime, nullable=True)
     
@@ -196,13 +224,13 @@ class Finding(Base):
 class Evidence(Base):
     __tablename__ = "evidence"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     finding_id = Column(UUID(as_uuid=True), ForeignKey("findings.id"), nullable=False)
     type = Column(SQLEnum(EvidenceType), nullable=False)
     storage_key = Column(String(512), nullable=False)
     filename = Column(String(255), nullable=True)
     size_bytes = Column(Integer, nullable=True)
-    extra = Column("metadata", JSON, nullable=False, default={})
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
@@ -211,34 +239,131 @@ class Evidence(Base):
 class Vote(Base):
     __tablename__ = "votes"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     finding_id = Column(UUID(as_uuid=True), ForeignKey("findings.id"), nullable=False)
     agent_id = Column(String(100), nullable=False)
     vote = Column(SQLEnum(VoteType), nullable=False)
     rationale = Column(Text, nullable=False)
     confidence = Column(Float, nullable=False)
-    extra = Column("metadata", JSON, nullable=False, default={})
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
     created_at = Column(DateTime, nullable=False, default=datetime.utcnow)
     
     # Relationships
     finding = relationship("Finding", back_populates="votes")
 
+# Loader options for routes that render a finding with its evidence and votes; the
+# relationships stay lazy by default so other Finding loads don't pay for them
+Finding.query_options = (selectinload(Finding.evidence), selectinload(Finding.votes))
+
+# Statuses shown on the project dashboard
+ACTIVE_JOB_STATUSES = (JobStatus.QUEUED.value, JobStatus.RUNNING.value, JobStatus.RETRYING.value)
+OPEN_FINDING_STATUSES = (FindingStatus.TENTATIVE.value, FindingStatus.VALIDATED.value)
+
+# Loader options for a project dashboard, e.g. session.get(Project, id, options=PROJECT_DASHBOARD_OPTIONS);
+# one IN query per collection, limited to active jobs and open findings
+PROJECT_DASHBOARD_OPTIONS = (
+    selectinload(Project.targets),
+    selectinload(Project.jobs.and_(Job.status.in_(ACTIVE_JOB_STATUSES))),
+    selectinload(Project.findings.and_(Finding.status.in_(OPEN_FINDING_STATUSES))),
+)
+
 class AgentLog(Base):
     __tablename__ = "agent_logs"
     
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    id = Column(UUID(as_uuid=True), primary_key=True, server_default=text("gen_random_uuid()"))
     agent_id = Column(String(100), nullable=False)
     job_id = Column(UUID(as_uuid=True), nullable=True)
     level = Column(String(20), nullable=False)
     message = Column(Text, nullable=False)
-    extra = Column("metadata", JSON, nullable=False, default={})
-    timestamp = Column(DateTime, nullable=False, default=datetime.utcnow)
+    extra = Column("metadata", JSONB, nullable=False, default=dict)
+    # Part of the key because agent_logs is range-partitioned by month on timestamp
+    timestamp = Column(DateTime, primary_key=True, default=datetime.utcnow)
+
+# Tables range-partitioned by month on "timestamp" (see migration 008)
+PARTITIONED_LOG_TABLES = ("agent_logs", "audit_logs")
 
 # Database connection management
+def _json_dumps(obj) -> str:
+    """Serialize JSON column values with orjson (SQLAlchemy expects str, not bytes)"""
+    return orjson.dumps(obj).decode()
+
+# Columns loaded by DatabaseManager.copy_logs; id comes from the gen_random_uuid() default
+AGENT_LOG_COPY_COLUMNS = ("agent_id", "job_id", "level", "message", "metadata", "timestamp")
+
+# Backslash escapes for COPY's text format
+_COPY_ESCAPES = str.maketrans({"\\": "\\\\", "\t": "\\t", "\n": "\\n", "\r": "\\r"})
+
+def _copy_field(value) -> str:
+    """Render a value as a COPY text-format field (JSON for dicts/lists, \\N for NULL)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, (dict, list)):
+        value = _json_dumps(value)
+    return str(value).translate(_COPY_ESCAPES)
+
+def bulk_insert(session, model, rows: List[Dict[str, Any]], returning=None) -> List[Any]:
+    """Insert many rows in one executemany, folded into multi-VALUES statements
+    
+    With ``returning`` set to a column, its values for the new rows are
+    returned in the same order as ``rows``.
+    """
+    if not rows:
+        return []
+    if returning is None:
+        session.execute(insert(model), rows)
+        return []
+    stmt = insert(model).returning(returning, sort_by_parameter_order=True)
+    return session.scalars(stmt, rows).all()
+
+@lru_cache(maxsize=None)
+def _get_engine(database_url: str) -> Tuple[Engine, Dict[str, float]]:
+    """Create the engine and its pool usage stats once per database URL per process"""
+    # Imported here because alembic's env.py loads this module outside the package
+    from .config import settings
+    
+    engine = create_engine(
+        database_url,
+        poolclass=QueuePool,
+        pool_pre_ping=True,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_overflow,
+        pool_use_lifo=True,
+        pool_recycle=settings.db_pool_recycle,
+        query_cache_size=settings.db_query_cache_size,
+        executemany_mode="values_plus_batch",
+        insertmanyvalues_page_size=settings.db_insertmanyvalues_page_size,
+        json_serializer=_json_dumps,
+        json_deserializer=orjson.loads
+    )
+    
+    # Pool usage: how often connections are checked out and how long they are held
+    pool_stats = {"checkouts": 0, "held_seconds": 0.0, "max_held_seconds": 0.0}
+    
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        """Record when a pooled connection is handed out"""
+        connection_record.info["checked_out_at"] = time.monotonic()
+        pool_stats["checkouts"] += 1
+    
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        """Accumulate how long the returned connection was held"""
+        checked_out_at = connection_record.info.pop("checked_out_at", None)
+        if checked_out_at is not None:
+            held = time.monotonic() - checked_out_at
+            pool_stats["held_seconds"] += held
+            pool_stats["max_held_seconds"] = max(pool_stats["max_held_seconds"], held)
+    
+    return engine, pool_stats
+
 class DatabaseManager:
     def __init__(self, database_url: str):
-        self.engine = create_engine(database_url, pool_pre_ping=True)
+        # Managers for the same URL share one engine and connection pool
+        self.engine, self.pool_stats = _get_engine(database_url)
         self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
+        self._Session = scoped_session(self.SessionLocal)
+        # Per-thread nesting depth of session_scope()
+        self._scope_depth = threading.local()
     
     def create_tables(self):
         """Create all tables in the database"""
@@ -248,6 +373,82 @@ class DatabaseManager:
         """Drop all tables in the database"""
         Base.metadata.drop_all(bind=self.engine)
     
+    def maintain_log_partitions(self, months_ahead: int, retention_months: int) -> List[str]:
+        """Create upcoming monthly log partitions and detach expired ones
+        
+        Returns the names of the detached partitions; they are left in place
+        as standalone tables for archiving or dropping.
+        """
+        detached = []
+        with self.engine.begin() as conn:
+            for table in PARTITIONED_LOG_TABLES:
+                conn.execute(
+                    text(
+                        "SELECT ensure_monthly_partitions(:parent, now()::date, "
+                        "(now() + make_interval(months => :ahead))::date)"
+                    ),
+                    {"parent": table, "ahead": months_ahead}
+                )
+                detached += conn.execute(
+                    text(
+                        "SELECT detach_monthly_partitions(:parent, "
+                        "(date_trunc('month', now()) - make_interval(months => :keep))::date)"
+                    ),
+                    {"parent": table, "keep": retention_months}
+                ).scalars().all()
+        return detached
+    
+    def copy_rows(self, table: str, columns: Sequence[str], rows: Iterable[Dict[str, Any]]) -> int:
+        """Bulk-load rows with COPY FROM STDIN in one transaction; returns the row count
+        
+        Rows are dicts keyed by column name; missing keys load as NULL.
+        """
+        buf = io.StringIO()
+        count = 0
+        for row in rows:
+            buf.write("\t".join(_copy_field(row.get(column)) for column in columns))
+            buf.write("\n")
+            count += 1
+        if not count:
+            return 0
+        
+        buf.seek(0)
+        column_list = ", ".join(f'"{column}"' for column in columns)
+        conn = self.engine.raw_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.copy_expert(f"COPY {table} ({column_list}) FROM STDIN", buf)
+            conn.commit()
+        finally:
+            conn.close()
+        return count
+    
+    def copy_logs(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Bulk-load agent log rows (keyed by AGENT_LOG_COPY_COLUMNS) via COPY
+        
+        For high-volume ingest; occasional single rows can still go through session.add().
+        """
+        return self.copy_rows("agent_logs", AGENT_LOG_COPY_COLUMNS, rows)
+    
+    def stream_logs(self, job_id, since: Optional[datetime] = None) -> Iterator[Mapping[str, Any]]:
+        """Yield a job's log rows (timestamp, level, message) oldest first
+        
+        Uses a Core select on a server-side cursor, so rows arrive as plain
+        mappings in batches of 1000 without ORM hydration or identity-map growth.
+        """
+        logs = AgentLog.__table__
+        stmt = (
+            select(logs.c.timestamp, logs.c.level, logs.c.message)
+            .where(logs.c.job_id == job_id)
+            .order_by(logs.c.timestamp)
+        )
+        if since is not None:
+            stmt = stmt.where(logs.c.timestamp > since)
+        
+        with self.engine.connect() as conn:
+            result = conn.execution_options(stream_results=True, yield_per=1000).execute(stmt)
+            yield from result.mappings()
+    
     def get_session(self):
         """Get a database session"""
         session = self.SessionLocal()
@@ -255,3 +456,23 @@ class DatabaseManager:
             yield session
         finally:
             session.close()
+    
+    @contextmanager
+    def session_scope(self):
+        """Provide the current thread's scoped session, rolling back on error
+        
+        Scopes may nest on one thread; they share the session, which is only
+        closed and discarded when the outermost scope exits.
+        """
+        depth = getattr(self._scope_depth, "value", 0)
+        self._scope_depth.value = depth + 1
+        session = self._Session()
+        try:
+            yield session
+        except Exception:
+            session.rollback()
+            raise
+        finally:
+            self._scope_depth.value = depth
+            if depth == 0:
+                self._Session.remove()
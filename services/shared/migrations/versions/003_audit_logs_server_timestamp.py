@@ -0,0 +1,24 @@
+"""Default audit log timestamps on the server
+
+Revision ID: 003
+Revises: 002
+Create Date: 2024-01-03 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Let Postgres stamp audit rows that are inserted without a timestamp
+    op.alter_column('audit_logs', 'timestamp', server_default=sa.func.now())
+
+
+def downgrade() -> None:
+    op.alter_column('audit_logs', 'timestamp', server_default=None)
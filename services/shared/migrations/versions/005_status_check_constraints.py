@@ -0,0 +1,42 @@
+"""Store job and finding status as varchar with CHECK constraints
+
+Revision ID: 005
+Revises: 004
+Create Date: 2024-01-05 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+JOB_STATUSES = ('queued', 'running', 'completed', 'failed', 'cancelled', 'retrying')
+FINDING_STATUSES = ('tentative', 'validated', 'false_positive', 'accepted', 'fixed')
+
+
+def _in_list(values) -> str:
+    return ", ".join(f"'{value}'" for value in values)
+
+
+def upgrade() -> None:
+    op.alter_column('jobs', 'status', type_=sa.String(16), postgresql_using='status::text')
+    op.alter_column('findings', 'status', type_=sa.String(16), postgresql_using='status::text')
+    op.execute("DROP TYPE IF EXISTS job_status")
+    op.execute("DROP TYPE IF EXISTS finding_status")
+    
+    op.create_check_constraint('ck_jobs_status', 'jobs', f"status IN ({_in_list(JOB_STATUSES)})")
+    op.create_check_constraint('ck_findings_status', 'findings', f"status IN ({_in_list(FINDING_STATUSES)})")
+
+
+def downgrade() -> None:
+    op.drop_constraint('ck_findings_status', 'findings', type_='check')
+    op.drop_constraint('ck_jobs_status', 'jobs', type_='check')
+    
+    op.execute(f"CREATE TYPE job_status AS ENUM ({_in_list(JOB_STATUSES)})")
+    op.execute(f"CREATE TYPE finding_status AS ENUM ({_in_list(FINDING_STATUSES)})")
+    op.execute("ALTER TABLE jobs ALTER COLUMN status TYPE job_status USING status::job_status")
+    op.execute("ALTER TABLE findings ALTER COLUMN status TYPE finding_status USING status::finding_status")
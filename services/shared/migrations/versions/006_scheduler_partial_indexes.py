@@ -0,0 +1,36 @@
+"""Add partial indexes for the scheduler and dashboard queries
+
+Revision ID: 006
+Revises: 005
+Create Date: 2024-01-06 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Only queued jobs and open findings are indexed, keeping both B-trees small;
+    # INCLUDE lets the scheduler read agent/test case ids without a heap fetch
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_jobs_queued_priority "
+            "ON jobs (priority DESC, created_at) INCLUDE (agent_id, test_case_id) "
+            "WHERE status = 'queued'"
+        )
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_findings_open "
+            "ON findings (project_id, severity) "
+            "WHERE status IN ('tentative', 'validated')"
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_findings_open")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_jobs_queued_priority")
@@ -0,0 +1,33 @@
+"""Generate primary keys server-side with gen_random_uuid()
+
+Revision ID: 007
+Revises: 006
+Create Date: 2024-01-07 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+TABLES = (
+    'projects', 'targets', 'credentials', 'test_cases', 'jobs',
+    'findings', 'evidence', 'votes', 'agent_logs', 'audit_logs',
+)
+
+
+def upgrade() -> None:
+    # gen_random_uuid() is built in from PostgreSQL 13; pgcrypto provides it on older servers
+    op.execute("CREATE EXTENSION IF NOT EXISTS pgcrypto")
+    
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=sa.text("gen_random_uuid()"))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.alter_column(table, 'id', server_default=None)
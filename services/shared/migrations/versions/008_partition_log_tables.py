@@ -0,0 +1,131 @@
+"""Partition agent_logs and audit_logs by month
+
+Revision ID: 008
+Revises: 007
+Create Date: 2024-01-08 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '008'
+down_revision = '007'
+branch_labels = None
+depends_on = None
+
+# Log tables and the indexes recreated on them, as (name, columns)
+LOG_TABLES = {
+    'agent_logs': [
+        ('idx_agent_logs_agent_time', ['agent_id', 'timestamp']),
+        ('idx_agent_logs_job', ['job_id']),
+        ('idx_agent_logs_level_time', ['level', 'timestamp']),
+    ],
+    'audit_logs': [
+        ('idx_audit_logs_user_time', ['user_id', 'timestamp']),
+        ('idx_audit_logs_action', ['action']),
+        ('idx_audit_logs_resource', ['resource_type', 'resource_id']),
+        ('idx_audit_logs_timestamp', ['timestamp']),
+    ],
+}
+
+# Months of partitions created ahead of now during the migration
+MONTHS_AHEAD = 3
+
+ENSURE_PARTITIONS_FN = """
+CREATE OR REPLACE FUNCTION ensure_monthly_partitions(parent text, from_month date, to_month date)
+RETURNS void LANGUAGE plpgsql AS $$
+DECLARE
+    lower_bound date := date_trunc('month', from_month)::date;
+BEGIN
+    WHILE lower_bound <= to_month LOOP
+        EXECUTE format(
+            'CREATE TABLE IF NOT EXISTS %I PARTITION OF %I FOR VALUES FROM (%L) TO (%L)',
+            parent || '_' || to_char(lower_bound, '"y"YYYY"m"MM'),
+            parent,
+            lower_bound,
+            (lower_bound + interval '1 month')::date
+        );
+        lower_bound := (lower_bound + interval '1 month')::date;
+    END LOOP;
+END
+$$
+"""
+
+DETACH_PARTITIONS_FN = """
+CREATE OR REPLACE FUNCTION detach_monthly_partitions(parent text, older_than date)
+RETURNS SETOF text LANGUAGE plpgsql AS $$
+DECLARE
+    part text;
+BEGIN
+    FOR part IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        JOIN pg_class base ON base.oid = pg_inherits.inhparent
+        WHERE base.relname = parent
+          AND child.relname ~ '_y[0-9]{4}m[0-9]{2}$'
+          AND to_date(right(child.relname, 8), '"y"YYYY"m"MM') + interval '1 month' <= older_than
+    LOOP
+        EXECUTE format('ALTER TABLE %I DETACH PARTITION %I', parent, part);
+        RETURN NEXT part;
+    END LOOP;
+END
+$$
+"""
+
+
+def _recreate_indexes(table: str) -> None:
+    for name, columns in LOG_TABLES[table]:
+        op.create_index(name, table, columns)
+
+
+def upgrade() -> None:
+    op.execute(ENSURE_PARTITIONS_FN)
+    op.execute(DETACH_PARTITIONS_FN)
+    
+    for table in LOG_TABLES:
+        legacy = f"{table}_legacy"
+        op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+        op.execute(f"ALTER TABLE {legacy} RENAME CONSTRAINT {table}_pkey TO {legacy}_pkey")
+        
+        # The partition key has to be part of the primary key
+        op.execute(
+            f'CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS INCLUDING CONSTRAINTS, '
+            f'PRIMARY KEY (id, "timestamp")) PARTITION BY RANGE ("timestamp")'
+        )
+        op.execute(
+            f"SELECT ensure_monthly_partitions('{table}', "
+            f'COALESCE((SELECT min("timestamp") FROM {legacy}), now())::date, '
+            f"(now() + interval '{MONTHS_AHEAD} months')::date)"
+        )
+        # Catches rows outside the maintained range instead of failing the insert
+        op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+        
+        op.execute(f"INSERT INTO {table} SELECT * FROM {legacy}")
+        op.execute(f"DROP TABLE {legacy}")
+        _recreate_indexes(table)
+    
+    op.create_foreign_key(
+        'agent_logs_job_id_fkey', 'agent_logs', 'jobs', ['job_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    for table in LOG_TABLES:
+        partitioned = f"{table}_partitioned"
+        op.execute(f"ALTER TABLE {table} RENAME TO {partitioned}")
+        op.execute(f"ALTER TABLE {partitioned} RENAME CONSTRAINT {table}_pkey TO {partitioned}_pkey")
+        
+        op.execute(
+            f"CREATE TABLE {table} (LIKE {partitioned} INCLUDING DEFAULTS INCLUDING CONSTRAINTS, "
+            f"PRIMARY KEY (id))"
+        )
+        op.execute(f"INSERT INTO {table} SELECT * FROM {partitioned}")
+        op.execute(f"DROP TABLE {partitioned} CASCADE")
+        _recreate_indexes(table)
+    
+    op.create_foreign_key(
+        'agent_logs_job_id_fkey', 'agent_logs', 'jobs', ['job_id'], ['id'], ondelete='CASCADE'
+    )
+    op.execute("DROP FUNCTION IF EXISTS detach_monthly_partitions(text, date)")
+    op.execute("DROP FUNCTION IF EXISTS ensure_monthly_partitions(text, date, date)")
@@ -0,0 +1,51 @@
+"""Compress large text columns with lz4
+
+Revision ID: 009
+Revises: 008
+Create Date: 2024-01-09 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '009'
+down_revision = '008'
+branch_labels = None
+depends_on = None
+
+COMPRESSED_COLUMNS = (
+    ('findings', 'description'),
+    ('findings', 'remediation'),
+    ('findings', 'affected_url'),
+    ('jobs', 'error_message'),
+    ('agent_logs', 'message'),
+    ('audit_logs', 'details'),
+)
+
+
+def _lz4_available() -> bool:
+    # Column compression needs PostgreSQL 14+ built with lz4 support
+    bind = op.get_bind()
+    if bind.dialect.server_version_info < (14,):
+        return False
+    enumvals = bind.execute(
+        sa.text("SELECT enumvals FROM pg_settings WHERE name = 'default_toast_compression'")
+    ).scalar()
+    return bool(enumvals) and 'lz4' in enumvals
+
+
+def _set_compression(method: str) -> None:
+    # Only affects newly written values; existing rows keep pglz until rewritten
+    for table, column in COMPRESSED_COLUMNS:
+        op.execute(f'ALTER TABLE {table} ALTER COLUMN {column} SET COMPRESSION {method}')
+
+
+def upgrade() -> None:
+    if _lz4_available():
+        _set_compression('lz4')
+
+
+def downgrade() -> None:
+    if _lz4_available():
+        _set_compression('pglz')
@@ -1,6 +1,7 @@
 """
 Security utilities for encryption, JWT, and authentication
 """
+import asyncio
 import jwt
 from datetime import datetime, timedelta
 from typing import Optional, Dict, Any
@@ -8,11 +9,19 @@ from cryptography.fernet import Fernet
 from passlib.context import CryptContext
 import base64
 import hashlib
+import time
 
 from .config import settings
+from .cache import TTLCache
 
-# Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing; new hashes use argon2, existing bcrypt hashes still verify
+# and are flagged for rehash by deprecated="auto"
+pwd_context = CryptContext(
+    schemes=["argon2", "bcrypt"],
+    deprecated="auto",
+    argon2__memory_cost=65536,
+    argon2__parallelism=2
+)
 
 def hash_password(password: str) -> str:
     """Hash a password"""
@@ -22,6 +31,14 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verify a password against a hash"""
     return pwd_context.verify(plain_password, hashed_password)
 
+async def hash_password_async(password: str) -> str:
+    """Hash a password in a worker thread so the event loop is not blocked"""
+    return await asyncio.to_thread(pwd_context.hash, password)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password in a worker thread so the event loop is not blocked"""
+    return await asyncio.to_thread(pwd_context.verify, plain_password, hashed_password)
+
 # JWT tokens
 def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
@@ -35,15 +52,31 @@ def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta]
     encoded_jwt = jwt.encode(to_encode, settings.jwt_secret, algorithm=settings.jwt_algorithm)
     return encoded_jwt
 
+# Verified token payloads keyed by token digest; entries never outlive the token's exp
+_token_cache = TTLCache(maxsize=10_000, ttl=60)
+
+def _token_key(token: str) -> bytes:
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
 def decode_access_token(token: str) -> Optional[Dict[str, Any]]:
-    """Decode and verify a JWT access token"""
+    """Decode and verify a JWT access token, reusing recent verifications"""
+    key = _token_key(token)
+    payload = _token_cache.get(key)
+    if payload is not None:
+        if payload.get("exp", 0) > time.time():
+            return payload
+        _token_cache.pop(key)
+    
     try:
         payload = jwt.decode(token, settings.jwt_secret, algorithms=[settings.jwt_algorithm])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    if "exp" in payload:
+        _token_cache.set(key, payload, ttl=min(_token_cache.ttl, payload["exp"] - time.time()))
+    return payload
 
 # Encryption for credentials
 def get_encryption_key() -> bytes:
@@ -72,6 +105,9 @@ def decrypt_credential(encrypted_data: str) -> str:
 def generate_api_key(user_id: str) -> str:
     """Generate a unique API key for a user"""
     timestamp = datetime.utcnow().isoformat()
-    data = f"{user_id}:{timestamp}:{settings.jwt_secret}"
-    hash_obj = hashlib.sha256(data.encode())
+    # Keyed BLAKE2b (key limited to 64 bytes) rather than hashing the secret into the message
+    hash_obj = hashlib.blake2b(digest_size=32, key=settings.jwt_secret.encode()[:64])
+    hash_obj.update(user_id.encode())
+    hash_obj.update(b":")
+    hash_obj.update(timestamp.encode())
     return f"apex_{hash_obj.hexdigest()}"
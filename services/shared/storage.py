@@ -1,13 +1,21 @@
 """
 Evidence storage management using MinIO/S3
 """
-from typing import Optional, BinaryIO
+from typing import Optional, BinaryIO, Iterator
 from minio import Minio
 from minio.error import S3Error
 import io
 from datetime import timedelta
 
 from .config import settings
+from .cache import TTLCache
+
+# Multipart part size for streamed uploads; MinIO requires at least 5 MiB
+UPLOAD_PART_SIZE = 8 * 1024 * 1024
+
+# Presigned URLs are reused for this fraction of their validity, so handed-out
+# links always have at least a fifth of their lifetime left
+PRESIGNED_URL_REUSE_FRACTION = 0.8
 
 class StorageManager:
     def __init__(self):
@@ -18,6 +26,7 @@ class StorageManager:
             secure=settings.minio_secure
         )
         self.bucket_name = settings.minio_bucket
+        self._presigned_urls = TTLCache(maxsize=10_000, ttl=3600 * PRESIGNED_URL_REUSE_FRACTION)
         self._ensure_bucket_exists()
     
     def _ensure_bucket_exists(self):
@@ -28,21 +37,29 @@ class StorageManager:
         except S3Error as e:
             print(f"Error creating bucket: {e}")
     
-    def upload_file(self, object_name: str, file_data: BinaryIO, length: int, content_type: str = "application/octet-stream") -> bool:
-        """Upload a file to storage"""
+    def upload_file(self, object_name: str, file_data: BinaryIO, length: int, content_type: str = "application/octet-stream", part_size: int = 0) -> bool:
+        """Upload a file to storage, streaming it in multipart chunks of part_size bytes (0 = MinIO default)"""
         try:
             self.client.put_object(
                 bucket_name=self.bucket_name,
                 object_name=object_name,
                 data=file_data,
                 length=length,
-                content_type=content_type
+                content_type=content_type,
+                part_size=part_size
             )
             return True
         except S3Error as e:
             print(f"Error uploading file: {e}")
             return False
     
+    def upload_stream(self, object_name: str, fileobj: BinaryIO, length: int = -1, part_size: int = UPLOAD_PART_SIZE, content_type: str = "application/octet-stream") -> bool:
+        """Stream a file-like object to storage as a multipart upload
+        
+        Only one part is buffered at a time; pass length=-1 when the size is unknown.
+        """
+        return self.upload_file(object_name, fileobj, length, content_type, part_size=part_size)
+    
     def upload_bytes(self, object_name: str, data: bytes, content_type: str = "application/octet-stream") -> bool:
         """Upload bytes to storage"""
         file_data = io.BytesIO(data)
@@ -61,13 +78,18 @@ class StorageManager:
             return None
     
     def get_presigned_url(self, object_name: str, expires: timedelta = timedelta(hours=1)) -> Optional[str]:
-        """Get a presigned URL for temporary access"""
+        """Get a presigned URL for temporary access, reusing a recently signed one"""
+        key = (object_name, expires)
+        url = self._presigned_urls.get(key)
+        if url is not None:
+            return url
         try:
             url = self.client.presigned_get_object(
                 bucket_name=self.bucket_name,
                 object_name=object_name,
                 expires=expires
             )
+            self._presigned_urls.set(key, url, ttl=expires.total_seconds() * PRESIGNED_URL_REUSE_FRACTION)
             return url
         except S3Error as e:
             print(f"Error generating presigned URL: {e}")
@@ -82,11 +104,11 @@ class StorageManager:
             print(f"Error deleting file: {e}")
             return False
     
-    def list_files(self, prefix: str = "") -> list:
-        """List files with a given prefix"""
+    def list_files(self, prefix: str = "") -> Iterator[str]:
+        """Lazily yield object names under a prefix, fetching listing pages on demand"""
         try:
-            objects = self.client.list_objects(bucket_name=self.bucket_name, prefix=prefix)
-            return [obj.object_name for obj in objects]
+            objects = self.client.list_objects(bucket_name=self.bucket_name, prefix=prefix, recursive=True)
+            for obj in objects:
+                yield obj.object_name
         except S3Error as e:
             print(f"Error listing files: {e}")
-            return []
@@ -0,0 +1,25 @@
+"""
+Shared Jinja2 environment for rendered reports
+"""
+import os
+import tempfile
+from typing import Dict
+
+from jinja2 import DictLoader, Environment, FileSystemBytecodeCache
+
+# Compiled template bytecode survives process restarts, so warm starts skip parsing
+JINJA_CACHE_DIR = os.path.join(tempfile.gettempdir(), "jinja_cache")
+os.makedirs(JINJA_CACHE_DIR, exist_ok=True)
+
+_templates: Dict[str, str] = {}
+
+env = Environment(
+    loader=DictLoader(_templates),
+    autoescape=True,
+    auto_reload=False,
+    bytecode_cache=FileSystemBytecodeCache(JINJA_CACHE_DIR)
+)
+
+def register_template(name: str, source: str):
+    """Make a template source available to env.get_template under the given name"""
+    _templates[name] = source
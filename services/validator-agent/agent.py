@@ -2,21 +2,172 @@
 Validator Agent - Multi-agent validation and cross-attestation
 """
 import os
-import sys
+import re
 import json
-from typing import Dict, Any, List
-import requests
-
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
+import time
+import asyncio
+from collections import defaultdict
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlsplit
+import aiohttp
+from sqlalchemy import select, update
 
 from shared.database import DatabaseManager, Finding, FindingStatus, Vote, VoteType
 from shared.config import settings
 
 try:
-    from debate import DebateCoordinator
+    from debate import DebateCoordinator, HIGH_SEVERITIES
 except ImportError:
     # Fallback if debate module not available
     DebateCoordinator = None
+    HIGH_SEVERITIES = frozenset()
+
+# Shared HTTP client, so reproduction probes reuse keep-alive connections across findings
+_HTTP_SESSION: Optional[aiohttp.ClientSession] = None
+
+def _get_http_session() -> aiohttp.ClientSession:
+    """Return the shared client session, creating it on first use inside the event loop"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is None or _HTTP_SESSION.closed:
+        _HTTP_SESSION = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=20, keepalive_timeout=30),
+            # Connect and per-read limits stop a slow target from holding a probe for the full 10s
+            timeout=aiohttp.ClientTimeout(total=10, connect=2, sock_read=5)
+        )
+    return _HTTP_SESSION
+
+async def _close_http_session():
+    """Close the shared client session, if one was opened"""
+    global _HTTP_SESSION
+    if _HTTP_SESSION is not None:
+        await _HTTP_SESSION.close()
+        _HTTP_SESSION = None
+
+# Probe retries on the shared session, in the style of urllib3's Retry(total=2, backoff_factor=0.3)
+PROBE_RETRIES = 2
+PROBE_BACKOFF = 0.3
+PROBE_RETRY_STATUSES = frozenset({502, 503, 504})
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+# Per-host circuit breaker, checked on every request attempt: after BREAKER_FAIL_MAX
+# consecutive failed attempts a host is skipped for BREAKER_RESET_TIMEOUT seconds, then
+# one trial attempt is let through (half-open) and its result closes or reopens it.
+# The agent validates one finding per process, so in practice this cuts short the
+# remaining retries of both probes once a finding's host has stopped answering.
+BREAKER_FAIL_MAX = 5
+BREAKER_RESET_TIMEOUT = 60.0
+
+class CircuitOpenError(Exception):
+    """Raised when requests to a host are suspended by its circuit breaker"""
+
+class _HostBreaker:
+    """Consecutive-failure counter for one host"""
+    
+    def __init__(self):
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self.trial_in_flight = False
+    
+    def allow(self) -> bool:
+        if self.opened_at is None:
+            return True
+        if self.trial_in_flight or time.monotonic() - self.opened_at < BREAKER_RESET_TIMEOUT:
+            return False
+        # Half-open: admit a single trial until it records a result
+        self.trial_in_flight = True
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.trial_in_flight = False
+    
+    def record_failure(self):
+        self.failures += 1
+        # A failed half-open trial reopens the breaker straight away
+        if self.opened_at is not None or self.failures >= BREAKER_FAIL_MAX:
+            self.opened_at = time.monotonic()
+        self.trial_in_flight = False
+    
+    def release(self):
+        """Free the trial slot of an attempt that ended without a result (e.g. cancelled)"""
+        self.trial_in_flight = False
+
+# Probes all run on one event loop, so the breakers need no locking
+_BREAKERS: Dict[str, _HostBreaker] = defaultdict(_HostBreaker)
+
+async def _probe(method: str, url: str, **kwargs) -> aiohttp.ClientResponse:
+    """Send a request on the shared session, retrying transient failures with backoff
+    
+    Failed connects are retried for any method; gateway errors only for
+    idempotent ones. Each attempt passes through the host's circuit breaker:
+    connection errors and timeouts count as failures, any response as a
+    success. The caller releases the response (``async with``).
+    """
+    http = _get_http_session()
+    host = urlsplit(url).hostname or ""
+    breaker = _BREAKERS[host]
+    for attempt in range(PROBE_RETRIES + 1):
+        last_attempt = attempt == PROBE_RETRIES
+        if not breaker.allow():
+            raise CircuitOpenError(f"Circuit open for {host}")
+        try:
+            response = await http.request(method, url, **kwargs)
+        except aiohttp.ClientConnectorError:
+            breaker.record_failure()
+            if last_attempt:
+                raise
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            breaker.record_failure()
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        else:
+            breaker.record_success()
+            if last_attempt or method not in IDEMPOTENT_METHODS or response.status not in PROBE_RETRY_STATUSES:
+                return response
+            response.release()
+        await asyncio.sleep(PROBE_BACKOFF * (2 ** attempt))
+
+# Response indicators, matched against raw body bytes without decoding or lowercasing them
+_CRITICAL_INDICATORS = re.compile(rb"error|exception|root:|uid=", re.IGNORECASE)
+_XSS_INDICATORS = re.compile(rb"<script>|alert\(")
+
+# Bytes carried between streamed chunks so an indicator split across a boundary still
+# matches (one less than the longest indicator), and the cap on how much body is scanned
+_INDICATOR_OVERLAP = len(b"exception") - 1
+PROBE_SCAN_CHUNK = 8192
+PROBE_SCAN_LIMIT = 1 << 20
+
+async def _scan_stream(response: aiohttp.ClientResponse, pattern: re.Pattern) -> bool:
+    """Search a response body as it streams in, stopping at the first match
+    
+    Reads at most PROBE_SCAN_LIMIT bytes. On a hit the connection is closed
+    so the rest of the body is never downloaded.
+    """
+    tail = b""
+    scanned = 0
+    async for chunk in response.content.iter_chunked(PROBE_SCAN_CHUNK):
+        chunk = chunk[:PROBE_SCAN_LIMIT - scanned]
+        window = tail + chunk
+        if pattern.search(window):
+            response.close()
+            return True
+        scanned += len(chunk)
+        if scanned >= PROBE_SCAN_LIMIT:
+            break
+        tail = window[-_INDICATOR_OVERLAP:]
+    return False
+
+# Finding columns read by the reproduction probes and vote casting
+FINDING_PROBE_COLUMNS = (
+    Finding.id,
+    Finding.title,
+    Finding.severity,
+    Finding.affected_url,
+    Finding.affected_parameter,
+)
 
 class ValidatorAgent:
     """Validates findings through multi-agent reproduction and debate"""
@@ -26,56 +177,57 @@ class ValidatorAgent:
         self.debate_coordinator = DebateCoordinator() if DebateCoordinator else None
         self.agent_id = "validator-agent-1"
     
-    def execute(self, finding_id: str):
+    async def execute(self, finding_id: str):
         """Execute validation on a finding"""
-        session = next(self.db_manager.get_session())
-        try:
-            finding = session.query(Finding).filter(Finding.id == finding_id).first()
-            if not finding:
-                print(f"Finding {finding_id} not found")
-                return
-            
-            print(f"Validating finding: {finding.title}")
-            
-            # Attempt primary reproduction
-            primary_result = self.reproduce_primary(finding)
-            
-            # Attempt secondary reproduction with different method
-            secondary_result = self.reproduce_secondary(finding)
-            
-            # Cast vote based on results
-            if primary_result and secondary_result:
-                self.cast_vote(session, finding, VoteType.ACCEPT, 
-                             "Successfully reproduced using multiple methods", 0.95)
-                finding.status = FindingStatus.VALIDATED
-                finding.confidence = 0.95
-            elif primary_result or secondary_result:
-                self.cast_vote(session, finding, VoteType.MORE_INFO,
-                             "Partially reproduced, needs more investigation", 0.6)
-                finding.confidence = 0.6
-            else:
-                self.cast_vote(session, finding, VoteType.REJECT,
-                             "Could not reproduce the finding", 0.2)
-                finding.status = FindingStatus.FALSE_POSITIVE
-                finding.confidence = 0.2
-            
-            session.commit()
-            
-            # Initiate multi-agent debate for high-severity findings
-            if self.debate_coordinator and finding.severity.value in ["critical", "high"]:
-                print(f"Initiating multi-agent debate for finding {finding_id}")
-                debate_agents = ["validator-agent", "exploit-agent", "recon-agent"]
-                debate_result = self.debate_coordinator.initiate_debate(str(finding_id), debate_agents)
-                print(f"Debate result: {debate_result.get('consensus', {})}")
+        with self.db_manager.session_scope() as session:
+            try:
+                # Plain row of the columns the probes read; no ORM entity is loaded
+                finding = session.execute(
+                    select(*FINDING_PROBE_COLUMNS).where(Finding.id == finding_id)
+                ).one_or_none()
+                if not finding:
+                    print(f"Finding {finding_id} not found")
+                    return
+                
+                print(f"Validating finding: {finding.title}")
+                
+                # Every (primary, secondary) combination maps to a different vote, so
+                # neither probe can be skipped; run both concurrently instead
+                primary_result, secondary_result = await asyncio.gather(
+                    self.reproduce_primary(finding),
+                    self.reproduce_secondary(finding)
+                )
+                
+                # Cast vote based on results
+                if primary_result and secondary_result:
+                    self.cast_vote(session, finding, VoteType.ACCEPT, 
+                                 "Successfully reproduced using multiple methods", 0.95)
+                    changes = {"status": FindingStatus.VALIDATED.value, "confidence": 0.95}
+                elif primary_result or secondary_result:
+                    self.cast_vote(session, finding, VoteType.MORE_INFO,
+                                 "Partially reproduced, needs more investigation", 0.6)
+                    changes = {"confidence": 0.6}
+                else:
+                    self.cast_vote(session, finding, VoteType.REJECT,
+                                 "Could not reproduce the finding", 0.2)
+                    changes = {"status": FindingStatus.FALSE_POSITIVE.value, "confidence": 0.2}
+                
+                session.execute(update(Finding).where(Finding.id == finding.id).values(**changes))
+                session.commit()
+                
+                # Initiate multi-agent debate for high-severity findings
+                if self.debate_coordinator and finding.severity.value in HIGH_SEVERITIES:
+                    print(f"Initiating multi-agent debate for finding {finding_id}")
+                    debate_agents = ["validator-agent", "exploit-agent", "recon-agent"]
+                    debate_result = self.debate_coordinator.initiate_debate(str(finding_id), debate_agents)
+                    print(f"Debate result: {debate_result.get('consensus', {})}")
+                
+                print(f"Validation completed for finding {finding_id}")
             
-            print(f"Validation completed for finding {finding_id}")
-        
-        except Exception as e:
-            print(f"Error validating finding: {e}")
-        finally:
-            session.close()
+            except Exception as e:
+                print(f"Error validating finding: {e}")
     
-    def reproduce_primary(self, finding: Finding) -> bool:
+    async def reproduce_primary(self, finding: Finding) -> bool:
         """Attempt primary reproduction"""
         print(f"Primary reproduction attempt for {finding.title}")
         
@@ -84,25 +236,24 @@ class ValidatorAgent:
         
         try:
             # Attempt to reproduce the vulnerability
-            response = requests.get(finding.affected_url, timeout=10)
-            
-            # Check for vulnerability indicators based on severity
-            if finding.severity.value == 'critical':
-                # For critical findings, look for strong indicators
-                indicators = ['error', 'exception', 'root:', 'uid=']
-                return any(ind in response.text.lower() for ind in indicators)
-            elif finding.severity.value == 'high':
-                # For high findings, check for XSS/injection patterns
-                return '<script>' in response.text or 'alert(' in response.text
-            else:
-                # For lower severity, be more lenient
-                return response.status_code == 200
+            severity = finding.severity.value
+            async with await _probe("GET", finding.affected_url) as response:
+                # Check for vulnerability indicators based on severity
+                if severity == 'critical':
+                    # For critical findings, look for strong indicators
+                    return await _scan_stream(response, _CRITICAL_INDICATORS)
+                elif severity == 'high':
+                    # For high findings, check for XSS/injection patterns
+                    return await _scan_stream(response, _XSS_INDICATORS)
+                else:
+                    # For lower severity, be more lenient
+                    return response.status == 200
         
         except Exception as e:
             print(f"Primary reproduction failed: {e}")
             return False
     
-    def reproduce_secondary(self, finding: Finding) -> bool:
+    async def reproduce_secondary(self, finding: Finding) -> bool:
         """Attempt secondary reproduction with different method"""
         print(f"Secondary reproduction attempt for {finding.title}")
         
@@ -110,15 +261,16 @@ class ValidatorAgent:
             return False
         
         try:
-            # Use different approach (e.g., POST instead of GET)
+            # Use different approach (e.g., POST instead of GET); only the status is needed
             if finding.affected_parameter:
                 data = {finding.affected_parameter: "test"}
-                response = requests.post(finding.affected_url, data=data, timeout=10)
+                request = _probe("POST", finding.affected_url, data=data)
             else:
-                response = requests.head(finding.affected_url, timeout=10)
+                request = _probe("HEAD", finding.affected_url)
             
-            # Check if response indicates vulnerability
-            return response.status_code in [200, 500, 403]
+            async with await request as response:
+                # Check if response indicates vulnerability
+                return response.status in [200, 500, 403]
         
         except Exception as e:
             print(f"Secondary reproduction failed: {e}")
@@ -137,6 +289,14 @@ class ValidatorAgent:
         session.add(vote_record)
         print(f"Cast vote: {vote.value} with confidence {confidence}")
 
+async def _run(finding_id: str):
+    """Validate one finding, then close the shared HTTP session"""
+    agent = ValidatorAgent()
+    try:
+        await agent.execute(finding_id)
+    finally:
+        await _close_http_session()
+
 def main():
     """Main entry point"""
     finding_id = os.getenv("FINDING_ID")
@@ -144,8 +304,7 @@ def main():
         print("No FINDING_ID provided")
         return
     
-    agent = ValidatorAgent()
-    agent.execute(finding_id)
+    asyncio.run(_run(finding_id))
 
 if __name__ == "__main__":
     main()
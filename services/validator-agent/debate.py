@@ -1,23 +1,79 @@
 """
 Multi-agent debate system for finding validation
 """
-import sys
-import os
-from typing import List, Dict, Any
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Deque, List, Dict, Any, Tuple
 from datetime import datetime
+from sqlalchemy import select, update
 
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '../'))
-
-from shared.agent_protocol import AgentMessage, VoteMessage
-from shared.database import DatabaseManager, Finding, Vote, VoteType
+from shared.agent_protocol import AgentMessage
+from shared.database import DatabaseManager, Finding, FindingSeverity, Vote, VoteType, bulk_insert
 from shared.config import settings
 
+# Upper bound on concurrent vote requests in one debate
+MAX_VOTE_WORKERS = 32
+
+# Finding columns the debate reads; agents vote from these alone
+FINDING_DEBATE_COLUMNS = (
+    Finding.id,
+    Finding.title,
+    Finding.description,
+    Finding.severity,
+    Finding.status,
+    Finding.confidence,
+    Finding.affected_url,
+)
+
+# Severity values the recon agent votes to accept, and that the validator puts to a debate
+HIGH_SEVERITIES = frozenset({FindingSeverity.CRITICAL.value, FindingSeverity.HIGH.value})
+
+# Simulated voting strategies per agent role; each returns (vote, confidence, rationale)
+VoteDecision = Tuple[str, float, str]
+
+def _vote_validator(severity: str, finding_confidence: float) -> VoteDecision:
+    """Validator agent is strict"""
+    vote = "accept" if finding_confidence > 0.7 else "more_info"
+    return vote, finding_confidence, f"Confidence threshold {'met' if vote == 'accept' else 'not met'}"
+
+def _vote_exploit(severity: str, finding_confidence: float) -> VoteDecision:
+    """Exploit agent checks if exploitation was successful"""
+    if finding_confidence > 0.8:
+        return "accept", 0.9, "Exploitation attempt succeeded"
+    return "reject", 0.3, "Exploitation attempt failed"
+
+def _vote_recon(severity: str, finding_confidence: float) -> VoteDecision:
+    """Recon agent validates based on information gathering"""
+    if severity in HIGH_SEVERITIES:
+        return "accept", 0.7, "Severity level indicates high risk"
+    return "more_info", 0.7, "Severity level indicates needs more analysis"
+
+def _vote_default(severity: str, finding_confidence: float) -> VoteDecision:
+    """Default voting logic"""
+    vote = "accept" if finding_confidence > 0.6 else "more_info"
+    return vote, finding_confidence, "Standard validation check"
+
+# Agent ids follow "<role>-agent[-<n>]"; the role prefix selects the strategy
+ROLE_VOTERS = {
+    "validator": _vote_validator,
+    "exploit": _vote_exploit,
+    "recon": _vote_recon,
+}
+
+@lru_cache(maxsize=4096)
+def _vote_decision(role: str, severity: str, finding_confidence: float) -> VoteDecision:
+    """Return the vote a simulated agent of this role casts"""
+    return ROLE_VOTERS.get(role, _vote_default)(severity, finding_confidence)
+
 class DebateCoordinator:
     """Coordinates multi-agent debate for finding validation"""
     
     def __init__(self):
         self.db_manager = DatabaseManager(settings.database_url)
-        self.messages: List[AgentMessage] = []
+        # Recent message history, appended to from the vote worker threads; deque.append is
+        # thread-safe and drops the oldest message once the bound is reached
+        self.messages: Deque[AgentMessage] = deque(maxlen=settings.debate_history_max)
     
     def initiate_debate(self, finding_id: str, agents: List[str]) -> Dict[str, Any]:
         """
@@ -32,57 +88,110 @@ class DebateCoordinator:
         """
         session = next(self.db_manager.get_session())
         try:
-            finding = session.query(Finding).filter(Finding.id == finding_id).first()
-            if not finding:
-                return {"error": "Finding not found"}
-            
-            # Collect votes from all agents
-            votes = []
-            for agent_id in agents:
-                vote = self._request_vote(agent_id, finding)
-                votes.append(vote)
+            # Votes and the resulting finding update commit together when the block exits
+            with session.begin():
+                # Plain row of the columns the agents vote on; no ORM entity is loaded
+                finding = session.execute(
+                    select(*FINDING_DEBATE_COLUMNS).where(Finding.id == finding_id)
+                ).one_or_none()
+                if not finding:
+                    return {"error": "Finding not found"}
                 
-                # Store vote in database
-                db_vote = Vote(
-                    finding_id=finding_id,
-                    agent_id=agent_id,
-                    vote=VoteType(vote["vote"]),
-                    rationale=vote["rationale"],
-                    confidence=vote["confidence"]
-                )
-                session.add(db_vote)
-            
-            session.commit()
-            
-            # Calculate consensus
-            consensus = self._calculate_consensus(votes)
-            
-            # Update finding status based on consensus
-            if consensus["decision"] == "accept":
-                finding.status = "validated"
-                finding.confidence = consensus["confidence"]
-            elif consensus["decision"] == "reject":
-                finding.status = "false_positive"
-            
-            session.commit()
-            
-            return {
-                "finding_id": finding_id,
-                "votes": votes,
-                "consensus": consensus,
-                "final_status": finding.status
-            }
+                # Collect votes from the agents; all votes in a round share one timestamp
+                votes = self._collect_votes(agents, finding, datetime.utcnow().isoformat())
+                
+                # Store all votes with one executemany, getting their server-generated ids back
+                vote_ids = bulk_insert(session, Vote, [
+                    {
+                        "finding_id": finding.id,
+                        "agent_id": vote["agent_id"],
+                        "vote": VoteType(vote["vote"]),
+                        "rationale": vote["rationale"],
+                        "confidence": vote["confidence"]
+                    }
+                    for vote in votes
+                ], returning=Vote.id)
+                
+                # Calculate consensus
+                consensus = self._calculate_consensus(votes, len(agents))
+                
+                # Update finding status based on consensus
+                final_status = finding.status
+                changes = {}
+                if consensus["decision"] == "accept":
+                    final_status = "validated"
+                    changes = {"status": final_status, "confidence": consensus["confidence"]}
+                elif consensus["decision"] == "reject":
+                    final_status = "false_positive"
+                    changes = {"status": final_status}
+                
+                if changes:
+                    session.execute(update(Finding).where(Finding.id == finding.id).values(**changes))
+                
+                return {
+                    "finding_id": finding_id,
+                    "votes": votes,
+                    "vote_ids": [str(vote_id) for vote_id in vote_ids],
+                    "consensus": consensus,
+                    "final_status": final_status
+                }
         
         finally:
             session.close()
     
-    def _request_vote(self, agent_id: str, finding: Finding) -> Dict[str, Any]:
+    def _collect_votes(self, agents: List[str], finding: Finding, timestamp: str) -> List[Dict[str, Any]]:
+        """
+        Request votes from the agents concurrently
+        
+        With ``debate_early_termination`` enabled, collection stops at the
+        shortest prefix of ``agents`` (in agent order) whose votes already give
+        accepts or rejects a strict majority of all agents, since the votes
+        after it can no longer change the decision. The prefix depends only on
+        the agent order and the votes, never on which request finishes first,
+        so the stored votes and consensus are reproducible.
+        
+        Requests not yet started are then cancelled. Requests already running
+        are not joined: their threads finish in the background and their votes
+        are discarded (only their messages still reach ``self.messages``).
+        
+        Returns:
+            Collected votes, in agent order
+        """
+        executor = ThreadPoolExecutor(max_workers=max(1, min(MAX_VOTE_WORKERS, len(agents))))
+        try:
+            if not settings.debate_early_termination:
+                return list(executor.map(lambda agent_id: self._request_vote(agent_id, finding, timestamp), agents))
+            
+            futures = {
+                executor.submit(self._request_vote, agent_id, finding, timestamp): index
+                for index, agent_id in enumerate(agents)
+            }
+            majority = len(agents) // 2
+            arrived: Dict[int, Dict[str, Any]] = {}
+            votes: List[Dict[str, Any]] = []
+            counts = Counter()
+            for future in as_completed(futures):
+                arrived[futures[future]] = future.result()
+                # Extend the agent-ordered prefix as far as the arrived votes allow
+                while len(votes) in arrived:
+                    vote = arrived[len(votes)]
+                    votes.append(vote)
+                    counts[vote["vote"]] += 1
+                    if counts["accept"] > majority or counts["reject"] > majority:
+                        return votes
+            return votes
+        finally:
+            # Cancel queued requests; running ones are left to finish unjoined (see above)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def _request_vote(self, agent_id: str, finding: Finding, timestamp: str) -> Dict[str, Any]:
         """
         Request a vote from an agent using the agent protocol
         
         Args:
             agent_id: The agent to request vote from
             finding: The finding to vote on
+            timestamp: ISO timestamp of the debate round
         
         Returns:
             Vote data
@@ -106,7 +215,7 @@ class DebateCoordinator:
         
         # Simulate agent response (in production, this would be async message passing)
         # For now, use simple heuristics based on agent type
-        vote_result = self._simulate_agent_vote(agent_id, finding)
+        vote_result = self._simulate_agent_vote(agent_id, finding, timestamp)
         
         # Create response message
         response_msg = AgentMessage(
@@ -120,66 +229,54 @@ class DebateCoordinator:
         
         return vote_result
     
-    def _simulate_agent_vote(self, agent_id: str, finding: Finding) -> Dict[str, Any]:
+    def _simulate_agent_vote(self, agent_id: str, finding: Finding, timestamp: str) -> Dict[str, Any]:
         """
         Simulate an agent's vote based on finding characteristics
         In production, this would call the actual agent
         """
-        # Different agents have different validation strategies
-        if "validator" in agent_id:
-            # Validator agent is strict
-            vote = "accept" if finding.confidence > 0.7 else "more_info"
-            confidence = finding.confidence
-            rationale = f"Confidence threshold {'met' if vote == 'accept' else 'not met'}"
-        
-        elif "exploit" in agent_id:
-            # Exploit agent checks if exploitation was successful
-            vote = "accept" if finding.confidence > 0.8 else "reject"
-            confidence = 0.9 if vote == "accept" else 0.3
-            rationale = "Exploitation attempt " + ("succeeded" if vote == "accept" else "failed")
-        
-        elif "recon" in agent_id:
-            # Recon agent validates based on information gathering
-            vote = "accept" if finding.severity in ["critical", "high"] else "more_info"
-            confidence = 0.7
-            rationale = "Severity level indicates " + ("high risk" if vote == "accept" else "needs more analysis")
-        
-        else:
-            # Default voting logic
-            vote = "accept" if finding.confidence > 0.6 else "more_info"
-            confidence = finding.confidence
-            rationale = "Standard validation check"
+        role = agent_id.split("-", 1)[0]
+        vote, confidence, rationale = _vote_decision(role, finding.severity.value, finding.confidence)
         
         return {
             "vote": vote,
             "rationale": rationale,
             "confidence": confidence,
             "agent_id": agent_id,
-            "timestamp": datetime.utcnow().isoformat()
+            "timestamp": timestamp
         }
     
-    def _calculate_consensus(self, votes: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def _calculate_consensus(self, votes: List[Dict[str, Any]], total_agents: int) -> Dict[str, Any]:
         """
         Calculate consensus from multiple agent votes
         
         Args:
-            votes: List of vote dictionaries
+            votes: List of vote dictionaries actually cast
+            total_agents: Number of agents asked to vote; with early termination
+                this can exceed ``len(votes)``
         
         Returns:
-            Consensus decision and confidence
+            Consensus decision and confidence. The majority threshold applies to
+            the votes cast: ``votes_cast`` reports that count and
+            ``total_agents`` the number of agents asked.
         """
         if not votes:
             return {"decision": "more_info", "confidence": 0.0}
         
-        # Count votes
-        accept_count = sum(1 for v in votes if v["vote"] == "accept")
-        reject_count = sum(1 for v in votes if v["vote"] == "reject")
-        more_info_count = sum(1 for v in votes if v["vote"] == "more_info")
+        # Count votes and total the accepting confidence in a single pass
+        counts = Counter()
+        total_confidence = 0.0
+        for v in votes:
+            vote = v["vote"]
+            counts[vote] += 1
+            if vote == "accept":
+                total_confidence += v["confidence"]
         
+        accept_count = counts["accept"]
+        reject_count = counts["reject"]
+        more_info_count = counts["more_info"]
         total_votes = len(votes)
         
         # Calculate weighted confidence
-        total_confidence = sum(v["confidence"] for v in votes if v["vote"] == "accept")
         avg_confidence = total_confidence / max(accept_count, 1)
         
         # Determine consensus
@@ -201,5 +298,6 @@ class DebateCoordinator:
                 "reject": reject_count,
                 "more_info": more_info_count
             },
-            "total_agents": total_votes
+            "total_agents": total_agents,
+            "votes_cast": total_votes
         }